@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Compact Template Benchmark - Accuracy, memory and latency of compact vs full templates
+
+Scores the same queries with GalleryMatcher (exhaustive, full float32
+templates) and CompactMatcher at several projection sizes, and reports how
+often the best match's identity agrees, the error of the best score, how
+often the accept/reject decision at TOLERANCE agrees, template memory,
+projection fit time and per-query latency.
+
+Galleries are synthetic by default: users drawn from a low-rank "face
+space" (--rank) with full-rank pose/capture noise, since real face images
+vary along far fewer directions than they have pixels. --faces uses the
+features of every face image in a folder, queried with shifted and re-lit
+copies of the same images.
+
+    python benchmarks/bench_compact.py
+    python benchmarks/bench_compact.py --sizes 1000,100000 --dims 32,64,128
+    python benchmarks/bench_compact.py --faces ~/lfw_sample --dims 32,64,96
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_identification import time_queries  # noqa: E402
+from compact_templates import CompactMatcher, CompactTemplates  # noqa: E402
+from face_matcher import GalleryMatcher  # noqa: E402
+from user_face_unlock import TOLERANCE, largest_face_features  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def make_gallery(size: int, dim: int, rank: int, poses: int, noise: float, queries: int,
+                 rng: np.random.Generator):
+    """Return (templates, owner of each template, queries, owner of each query)"""
+    users = max(1, size // poses)
+    face_space = rng.standard_normal((rank, dim), dtype=np.float32) / np.sqrt(dim)
+    base = 0.5 + rng.standard_normal((users, rank), dtype=np.float32) @ face_space
+    owners = np.arange(size) % users
+    templates = base[owners] + noise * rng.standard_normal((size, dim), dtype=np.float32) / np.sqrt(dim)
+    query_owners = rng.integers(0, users, queries)
+    probes = base[query_owners] + noise * rng.standard_normal((queries, dim), dtype=np.float32) / np.sqrt(dim)
+    return templates, owners, probes, query_owners
+
+
+def face_features(folder: str, rng: np.random.Generator):
+    """Return (templates, owners, queries, query owners) from the face images in a folder"""
+    templates, queries = [], []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        gray = cv2.imread(os.path.join(folder, name), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        features = largest_face_features(gray)
+        if features is None:
+            continue
+        # A second capture: small shift and a lighting change
+        dx, dy = rng.integers(-3, 4, 2)
+        shifted = cv2.warpAffine(gray, np.float32([[1, 0, dx], [0, 1, dy]]), gray.shape[::-1],
+                                 borderMode=cv2.BORDER_REPLICATE)
+        shifted = cv2.convertScaleAbs(shifted, alpha=rng.uniform(0.8, 1.2), beta=rng.uniform(-20, 20))
+        query = largest_face_features(shifted)
+        if query is None:
+            continue
+        templates.append(features)
+        queries.append(query)
+    owners = np.arange(len(templates))
+    return np.stack(templates), owners, np.stack(queries), owners
+
+
+def compare(full: GalleryMatcher, compact: CompactMatcher, owners: np.ndarray,
+            queries: np.ndarray, query_owners: np.ndarray, batch: int):
+    exact_idx, exact_best = full.best_match(queries, exhaustive=True)
+    approx_idx, approx_ms = time_queries(compact.best_match, queries, batch)
+    _, approx_best = compact.best_match(queries)
+    return {
+        "agree": float(np.mean(owners[exact_idx] == owners[approx_idx])),
+        "accuracy": float(np.mean(owners[approx_idx] == query_owners)),
+        "score_err": float(np.mean(np.abs(exact_best - approx_best))),
+        "decision": float(np.mean((exact_best >= TOLERANCE) == (approx_best >= TOLERANCE))),
+        "ms": float(np.median(approx_ms)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,10000",
+                        help="Comma-separated synthetic gallery sizes (templates)")
+    parser.add_argument("--dims", default="32,64,128", help="Comma-separated compact dimensions")
+    parser.add_argument("--faces", help="Folder of face images to use instead of synthetic galleries")
+    parser.add_argument("--dim", type=int, default=4096, help="Synthetic feature dimension")
+    parser.add_argument("--rank", type=int, default=64, help="Dimensions synthetic identities vary in")
+    parser.add_argument("--poses", type=int, default=5, help="Synthetic templates per user")
+    parser.add_argument("--noise", type=float, default=0.5, help="Synthetic pose/capture noise level")
+    parser.add_argument("--queries", type=int, default=200, help="Number of synthetic probe captures")
+    parser.add_argument("--batch", type=int, default=1, help="Faces scored per call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.faces:
+        datasets = [face_features(args.faces, rng)]
+        print(f"{len(datasets[0][0])} faces from {args.faces}")
+    else:
+        datasets = [make_gallery(int(size), args.dim, args.rank, args.poses, args.noise,
+                                 args.queries, rng) for size in args.sizes.split(",")]
+
+    print(f"{'templates':>10} {'dim':>5} {'MB':>8} {'fit s':>6} {'ms/q':>8} {'id acc':>7} "
+          f"{'agree':>6} {'score err':>10} {'decision':>9}")
+    for templates, owners, queries, query_owners in datasets:
+        full = GalleryMatcher(templates, use_index=False)
+        full_idx, full_ms = time_queries(lambda q: full.best_match(q, exhaustive=True), queries, args.batch)
+        accuracy = float(np.mean(owners[full_idx] == query_owners))
+        print(f"{len(templates):>10} {'full':>5} {full.templates.nbytes / 1e6:>8.2f} {'':>6} "
+              f"{np.median(full_ms):>8.3f} {accuracy:>7.3f} {1.0:>6.3f} {0.0:>10.4f} {1.0:>9.3f}")
+        for dim in [int(d) for d in args.dims.split(",")]:
+            t0 = time.perf_counter()
+            compact = CompactTemplates.from_templates(templates, dim)
+            fit_s = time.perf_counter() - t0
+            result = compare(full, CompactMatcher(compact), owners, queries, query_owners, args.batch)
+            print(f"{len(templates):>10} {compact.codec.dim:>5} {compact.nbytes / 1e6:>8.2f} "
+                  f"{fit_s:>6.1f} {result['ms']:>8.3f} {result['accuracy']:>7.3f} {result['agree']:>6.3f} "
+                  f"{result['score_err']:>10.4f} {result['decision']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Dedup Benchmark - Gallery size, match rate and match time before and after template dedup
+
+Synthetic mode turns one face image into a burst-heavy enrollment set:
+several poses (rotation and scale), each captured as a burst of nearly
+identical frames. Probes are fresh captures of random poses. Folder mode
+enrolls a folder laid out like face_model/ and probes with every other image.
+
+    python benchmarks/bench_dedup.py --face face_model/me.jpg
+    python benchmarks/bench_dedup.py --folder face_model --similarity 0.9
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import user_face_unlock as app  # noqa: E402
+from face_gallery import TemplateGallery  # noqa: E402
+from face_matcher import GalleryMatcher  # noqa: E402
+from template_dedup import dedup_gallery  # noqa: E402
+
+
+def capture(img: np.ndarray, angle: float, scale: float, jitter: float,
+            rng: np.random.Generator) -> np.ndarray:
+    """One grayscale capture of a pose with small random shift, lighting change and noise"""
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, scale)
+    m[:, 2] += rng.uniform(-jitter, jitter, 2)
+    frame = cv2.warpAffine(img, m, (w, h), borderMode=cv2.BORDER_REPLICATE).astype(np.float32)
+    frame = frame * rng.uniform(1 - 0.02 * jitter, 1 + 0.02 * jitter) + rng.normal(0, jitter, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def synthetic_set(args, rng):
+    img = cv2.imread(args.face, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise SystemExit(f"❌ Could not read {args.face}")
+    poses = [(rng.uniform(-15, 15), rng.uniform(0.9, 1.1)) for _ in range(args.poses)]
+    enrolled = []
+    for angle, scale in poses:
+        for _ in range(args.burst):
+            features = app.largest_face_features(capture(img, angle, scale, 1.0, rng))
+            if features is not None:
+                enrolled.append(features)
+    probes = []
+    for _ in range(args.probes):
+        angle, scale = poses[rng.integers(len(poses))]
+        features = app.largest_face_features(capture(img, angle, scale, 2.0, rng))
+        if features is not None:
+            probes.append(features)
+    return {app.DEFAULT_USER_ID: enrolled}, [(app.DEFAULT_USER_ID, p) for p in probes]
+
+
+def folder_set(args):
+    enrolled, probes = {}, []
+    for user_id, paths in app.list_enrollment_images(args.folder).items():
+        for i, path in enumerate(paths):
+            features = app.extract_enrollment_features(path)
+            if features is None:
+                continue
+            if i % 2:
+                probes.append((user_id, features))
+            else:
+                enrolled.setdefault(user_id, []).append(features)
+    return enrolled, probes
+
+
+def evaluate(gallery: TemplateGallery, probes):
+    """Match rate of the probes and median per-query match time (ms)"""
+    matcher = GalleryMatcher(gallery.templates)
+    matched, times = 0, []
+    for user_id, features in probes:
+        t0 = time.perf_counter()
+        idx, score = matcher.best_match(features[np.newaxis, :])
+        times.append((time.perf_counter() - t0) * 1000.0)
+        matched += score[0] >= app.TOLERANCE and gallery.user_for(idx[0]) == user_id
+    return matched / max(1, len(probes)), float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--face", help="Face image for the synthetic enrollment set")
+    parser.add_argument("--folder", help="Enrollment folder (images, or one subfolder per user)")
+    parser.add_argument("--poses", type=int, default=8)
+    parser.add_argument("--burst", type=int, default=25, help="Near-identical frames per pose")
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--similarity", type=float, default=app.ENROLL_DEDUP_SIMILARITY)
+    parser.add_argument("--max-templates", type=int, default=app.ENROLL_MAX_TEMPLATES_PER_USER)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.face and not args.folder:
+        parser.error("give --face or --folder")
+
+    rng = np.random.default_rng(args.seed)
+    enrolled, probes = folder_set(args) if args.folder else synthetic_set(args, rng)
+    gallery = TemplateGallery.from_mapping(enrolled)
+    deduped, report = dedup_gallery(gallery, args.similarity, args.max_templates, app.TOLERANCE)
+
+    print(f"{len(probes)} probes; {report.summary()}")
+    print(f"{'gallery':>10} {'templates':>10} {'match rate':>11} {'ms/query':>9}")
+    for name, g in (("full", gallery), ("deduped", deduped)):
+        rate, ms = evaluate(g, probes)
+        print(f"{name:>10} {len(g):>10} {rate:>11.3f} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
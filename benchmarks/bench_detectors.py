@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Detector Benchmark - Throughput and recall of the face detection backends
+
+Runs each detector configuration over the same frames and reports
+per-frame detection time, frames/sec, recall and false positives per frame.
+A configuration is a backend name with an optional downscale factor,
+e.g. "haar", "haar@0.5", "lbp", "yunet@0.5".
+
+Ground truth is the planted face on synthetic frames; for recordings it is
+the first configuration's detections (so recall is agreement with it).
+
+    python benchmarks/bench_detectors.py --face face_model/me.jpg
+    python benchmarks/bench_detectors.py --source recording.mp4 --configs haar,haar@0.5,yunet \\
+        --yunet-model models/face_detection_yunet_2023mar.onnx
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import face_detectors  # noqa: E402
+from face_tracking import box_iou  # noqa: E402
+from frame_sources import SyntheticFrameSource, open_source  # noqa: E402
+from user_face_unlock import MIN_FACE_SIZE  # noqa: E402
+
+CROP_MARGIN = 0.4  # Context kept around the face planted in synthetic frames
+
+
+def planted_face(face_path: str) -> np.ndarray:
+    """Crop the face (plus CROP_MARGIN of context) from an image with the reference detector"""
+    img = cv2.imread(face_path)
+    if img is None:
+        raise SystemExit(f"❌ Could not read {face_path}")
+    faces = face_detectors.create_detector("haar").detect(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), MIN_FACE_SIZE)
+    if len(faces) == 0:
+        raise SystemExit(f"❌ No face found in {face_path}")
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    mx, my = int(w * CROP_MARGIN), int(h * CROP_MARGIN)
+    return img[max(0, y - my):y + h + my, max(0, x - mx):x + w + mx]
+
+
+def face_box_in_crop(box) -> Tuple[int, int, int, int]:
+    """The face inside a planted crop box, undoing CROP_MARGIN"""
+    x, y, w, h = box
+    side = w / (1 + 2 * CROP_MARGIN)
+    offset = (w - side) / 2
+    return int(x + offset), int(y + offset), int(side), int(side)
+
+
+def load_frames(args) -> Tuple[List[np.ndarray], List[list]]:
+    """Grayscale frames and their ground-truth boxes (None when unknown)"""
+    frames, truth = [], []
+    if args.source == "synthetic":
+        if not args.face:
+            raise SystemExit("❌ Synthetic frames need --face")
+        source = SyntheticFrameSource(planted_face(args.face), frames=args.frames)
+    else:
+        source = open_source(args.source)
+    with source:
+        while not args.frames or len(frames) < args.frames:
+            ret, frame = source.read_frame()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            box = getattr(source, "last_face_box", None)
+            truth.append([face_box_in_crop(box)] if box is not None else None)
+    return frames, truth
+
+
+def build(config: str, args) -> face_detectors.FaceDetector:
+    backend, _, scale = config.partition("@")
+    params = {}
+    if backend == "lbp" and args.lbp_cascade:
+        params["cascade_file"] = args.lbp_cascade
+    if backend == "yunet" and args.yunet_model:
+        params["model_file"] = args.yunet_model
+    return face_detectors.create_detector(backend, float(scale or 1.0), **params)
+
+
+def evaluate(detector, frames, truth, min_iou: float):
+    times, found, expected, false_positives = [], 0, 0, 0
+    detections = []
+    for gray, boxes in zip(frames, truth):
+        t0 = time.perf_counter()
+        faces = detector.detect(gray, MIN_FACE_SIZE)
+        times.append(time.perf_counter() - t0)
+        faces = [tuple(int(v) for v in f) for f in faces]
+        detections.append(faces)
+        if boxes is None:
+            continue
+        expected += len(boxes)
+        hits = [f for f in faces if max((box_iou(f, b) for b in boxes), default=0.0) >= min_iou]
+        found += min(len(hits), len(boxes))
+        false_positives += len(faces) - len(hits)
+    ms = np.asarray(times) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+        "fps": len(frames) / ms.sum() * 1000.0 if ms.sum() > 0 else 0.0,
+        "recall": found / expected if expected else None,
+        "false_positives_per_frame": false_positives / len(frames) if expected else None,
+    }, detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default="synthetic",
+                        help="'synthetic', a video file, an image-sequence pattern, or an image folder")
+    parser.add_argument("--face", help="Face image to plant in synthetic frames")
+    parser.add_argument("--frames", type=int, default=150, help="Frames to use (0 = all)")
+    parser.add_argument("--configs", default="haar,haar@0.5,lbp,lbp@0.5,yunet,yunet@0.5",
+                        help="Comma-separated backend[@scale] configurations")
+    parser.add_argument("--lbp-cascade", help="LBP cascade XML file")
+    parser.add_argument("--yunet-model", help="YuNet ONNX model file")
+    parser.add_argument("--min-iou", type=float, default=0.3, help="IoU for a detection to count")
+    args = parser.parse_args()
+
+    frames, truth = load_frames(args)
+    if not frames:
+        print(f"❌ No frames read from {args.source}")
+        return 1
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    for config in args.configs.split(","):
+        try:
+            detector = build(config, args)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"  {config:<12} skipped: {e}")
+            continue
+        detector.detect(frames[0], MIN_FACE_SIZE)  # Warm-up
+        result, detections = evaluate(detector, frames, truth, args.min_iou)
+        if truth[0] is None:
+            # No ground truth: later configurations are scored against the first one
+            truth = [[tuple(f) for f in faces] for faces in detections]
+        recall = "n/a" if result["recall"] is None else f"{result['recall']:.3f}"
+        fp = "n/a" if result["false_positives_per_frame"] is None else f"{result['false_positives_per_frame']:.3f}"
+        print(f"  {config:<12} p50 {result['p50_ms']:6.2f} ms  p95 {result['p95_ms']:6.2f} ms  "
+              f"{result['fps']:7.1f} fps  recall {recall}  false positives/frame {fp}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
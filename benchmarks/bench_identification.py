@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Identification Benchmark - Recall and latency of the IVF index against exhaustive search
+
+Builds synthetic multi-user galleries (several noisy poses per user), then
+queries them with fresh noisy captures of enrolled users.
+
+    python benchmarks/bench_identification.py
+    python benchmarks/bench_identification.py --sizes 10,1000,100000 --nprobe 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_matcher import GalleryMatcher  # noqa: E402
+
+
+def make_gallery(size: int, dim: int, poses: int, noise: float, rng: np.random.Generator):
+    """Return (templates, owner of each template, user base vectors)"""
+    users = max(1, size // poses)
+    base = rng.random((users, dim), dtype=np.float32)
+    owners = np.arange(size) % users
+    templates = base[owners] + noise * rng.standard_normal((size, dim), dtype=np.float32)
+    return templates, owners, base
+
+
+def time_queries(fn, queries: np.ndarray, batch: int):
+    """Run fn over the queries in batches; return (results, per-query latencies in ms)"""
+    indices = []
+    latencies = []
+    for start in range(0, queries.shape[0], batch):
+        chunk = queries[start:start + batch]
+        t0 = time.perf_counter()
+        idx, _ = fn(chunk)
+        latencies.append((time.perf_counter() - t0) * 1000.0 / chunk.shape[0])
+        indices.append(idx)
+    return np.concatenate(indices), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,100,1000,10000",
+                        help="Comma-separated gallery sizes (templates)")
+    parser.add_argument("--dim", type=int, default=4096, help="Feature dimension")
+    parser.add_argument("--poses", type=int, default=5, help="Templates per user")
+    parser.add_argument("--noise", type=float, default=0.15, help="Pose/capture noise level")
+    parser.add_argument("--queries", type=int, default=200, help="Number of probe captures")
+    parser.add_argument("--batch", type=int, default=1, help="Faces scored per call")
+    parser.add_argument("--nprobe", type=int, default=8, help="Inverted lists scanned per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'templates':>10} {'lists':>6} {'build s':>8} {'exh ms/q':>9} "
+          f"{'ivf ms/q':>9} {'speedup':>8} {'recall@1':>9} {'id acc':>7}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        templates, owners, base = make_gallery(size, args.dim, args.poses, args.noise, rng)
+        probe_users = rng.integers(0, base.shape[0], args.queries)
+        queries = base[probe_users] + args.noise * rng.standard_normal(
+            (args.queries, args.dim), dtype=np.float32)
+
+        t0 = time.perf_counter()
+        matcher = GalleryMatcher(templates, use_index=size > 1, nprobe=args.nprobe)
+        build_s = time.perf_counter() - t0
+
+        exact, exact_ms = time_queries(
+            lambda q: matcher.best_match(q, exhaustive=True), queries, args.batch)
+        approx, approx_ms = time_queries(matcher.best_match, queries, args.batch)
+
+        recall = float(np.mean(exact == approx))
+        accuracy = float(np.mean(owners[approx] == probe_users))
+        nlist = matcher.index.nlist if matcher.index is not None else 0
+        exh, ivf = np.median(exact_ms), np.median(approx_ms)
+        print(f"{size:>10} {nlist:>6} {build_s:>8.2f} {exh:>9.3f} {ivf:>9.3f} "
+              f"{exh / ivf:>7.1f}x {recall:>9.3f} {accuracy:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
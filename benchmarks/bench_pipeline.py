@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark - Offline replay of the recognition pipeline without a camera
+
+Feeds recorded video, an image folder, or synthetic frames with a planted
+face through the same detect / extract_face_features / matcher path that
+is_live_sequence uses. Reports frames/sec, p50/p95/p99 latency per stage
+and time-to-decision across gallery sizes and frame resolutions, and can
+save JSON results for comparing revisions.
+
+Decisions are timed for each decision mode (sequential test and fixed match
+count), both for the enrolled face ("genuine") and against a gallery without
+it ("impostor"), giving time-to-unlock, time-to-reject and false-accept rate.
+Synthetic frames show a differently captured face each frame and the user is
+enrolled from several such captures (--variation, --enroll-shots), so genuine
+scores spread below 1.0 the way live captures do; --variation 0 plants the
+exact enrolled crop.
+
+    python benchmarks/bench_pipeline.py --face face_model/me.jpg
+    python benchmarks/bench_pipeline.py --source recording.mp4 --face face_model/me.jpg \\
+        --gallery-sizes 10,1000,10000 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import user_face_unlock as app  # noqa: E402
+from face_gallery import DEFAULT_USER_ID, TemplateGallery  # noqa: E402
+from face_matcher import GalleryMatcher  # noqa: E402
+from face_tracking import FaceTracker  # noqa: E402
+from frame_sources import IMAGE_EXTENSIONS, SyntheticFrameSource, open_source, vary_face  # noqa: E402
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize stage durations (seconds) in milliseconds"""
+    ms = np.asarray(samples) * 1000.0
+    if ms.size == 0:
+        return {"count": 0}
+    return {"count": int(ms.size), "mean": float(ms.mean()),
+            "p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99))}
+
+
+def default_face_image() -> Optional[str]:
+    folder = os.path.join(REPO_DIR, "face_model")
+    if not os.path.isdir(folder):
+        return None
+    images = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    return os.path.join(folder, images[0]) if images else None
+
+
+def face_crop(img: np.ndarray, margin: float = 0.4) -> np.ndarray:
+    """Crop the largest face (with some context) so it can be planted in synthetic frames"""
+    faces = app.detect_faces(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    if len(faces) == 0:
+        return img
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    mx, my = int(w * margin), int(h * margin)
+    return img[max(0, y - my):y + h + my, max(0, x - mx):x + w + mx]
+
+
+def enrollment_shots(args, face_img: Optional[np.ndarray],
+                     rng: np.random.Generator) -> List[np.ndarray]:
+    """Features of the enrolled user: varied captures of the face, or the --face image itself"""
+    if face_img is not None and args.variation > 0:
+        shots = [app.largest_face_features(cv2.cvtColor(vary_face(face_img, rng, args.variation),
+                                                         cv2.COLOR_BGR2GRAY))
+                 for _ in range(args.enroll_shots)]
+        return [features for features in shots if features is not None]
+    enrolled = app.extract_enrollment_features(args.face) if args.face else None
+    return [enrolled] if enrolled is not None else []
+
+
+def build_gallery(size: int, enrolled: List[np.ndarray], rng: np.random.Generator) -> TemplateGallery:
+    """Enrolled user's templates plus synthetic distractor users up to `size` templates"""
+    mapping = {}
+    if enrolled:
+        mapping[DEFAULT_USER_ID] = list(enrolled)
+    for i in range(size - len(enrolled)):
+        # Blurred noise run through the real feature extractor looks like a face crop
+        noise = rng.integers(0, 256, (96, 96), dtype=np.uint8)
+        mapping[f"distractor_{i:06d}"] = [app.extract_face_features(cv2.GaussianBlur(noise, (0, 0), 3))]
+    return TemplateGallery.from_mapping(mapping)
+
+
+def make_source(args, face_img: Optional[np.ndarray], resolution, fps: Optional[float] = None,
+                seed: int = 0):
+    if args.source == "synthetic":
+        return SyntheticFrameSource(face_img, size=resolution, frames=args.frames, fps=fps,
+                                    seed=seed, variation=args.variation)
+    return open_source(args.source, size=resolution, fps=fps)
+
+
+def run_stages(source, matcher: GalleryMatcher) -> Dict:
+    """Process every frame of a source, timing each stage"""
+    timings: Dict[str, List[float]] = {}
+    tracker = FaceTracker(app.detect_faces, app.MIN_FACE_SIZE,
+                          full_scan_interval=app.TRACKING_FULL_SCAN_INTERVAL) if app.FACE_TRACKING else None
+    faces_per_frame = []
+    frames = 0
+    start = time.perf_counter()
+    with source:
+        while True:
+            t0 = time.perf_counter()
+            ret, frame = source.read_frame()
+            if not ret:
+                break
+            t1 = time.perf_counter()
+            timings.setdefault("capture", []).append(t1 - t0)
+            best_idx, _ = app.process_frame(frame, matcher, tracker, timings)
+            timings.setdefault("total", []).append(time.perf_counter() - t0)
+            faces_per_frame.append(len(best_idx))
+            frames += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "faces_per_frame": float(np.mean(faces_per_frame)) if faces_per_frame else 0.0,
+        "stages": {stage: percentiles(samples) for stage, samples in timings.items()},
+    }
+
+
+DECISION_MODES = {"sequential": True, "count": False}
+
+
+def run_decisions(args, face_img, resolution, gallery: TemplateGallery, mode: str) -> Dict:
+    """Time full is_live_sequence runs on a camera-paced replay"""
+    runs = []
+    saved = app.SEQUENTIAL_DECISION
+    app.SEQUENTIAL_DECISION = DECISION_MODES[mode]
+    try:
+        for run in range(args.decision_runs):
+            source = make_source(args, face_img, resolution, fps=args.fps or None, seed=run)
+            t0 = time.perf_counter()
+            result = app.is_live_sequence(window_sec=args.window, camera=source, gallery=gallery)
+            runs.append({"seconds": time.perf_counter() - t0, "matched": bool(result),
+                         "user_id": result.user_id})
+    finally:
+        app.SEQUENTIAL_DECISION = saved
+    seconds = [r["seconds"] for r in runs]
+    return {"median_s": float(np.median(seconds)) if seconds else None,
+            "match_rate": float(np.mean([r["matched"] for r in runs])) if runs else None,
+            "runs": runs}
+
+
+def environment() -> Dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                  text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        revision = None
+    return {"revision": revision, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(), "python": platform.python_version(),
+            "opencv": cv2.__version__, "numpy": np.__version__}
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["source"], r["resolution"], r["gallery_size"]): r
+                    for r in json.load(f)["results"]}
+    print(f"\nComparison with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["source"], r["resolution"], r["gallery_size"]))
+        if old is None:
+            continue
+        fps_delta = (r["fps"] / old["fps"] - 1) * 100 if old["fps"] else 0.0
+        p95_old = old["stages"]["total"]["p95"]
+        p95_delta = (r["stages"]["total"]["p95"] / p95_old - 1) * 100 if p95_old else 0.0
+        print(f"  {r['resolution']:>9} gallery {r['gallery_size']:>6}: "
+              f"fps {fps_delta:+.1f}%, total p95 {p95_delta:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default="synthetic",
+                        help="'synthetic', a video file, an image-sequence pattern, or an image folder")
+    parser.add_argument("--face", default=default_face_image(),
+                        help="Face image to enroll (and plant in synthetic frames)")
+    parser.add_argument("--gallery-sizes", default="1,100,1000", help="Comma-separated template counts")
+    parser.add_argument("--resolutions", default="640x480,1280x720", help="Comma-separated WxH")
+    parser.add_argument("--frames", type=int, default=150, help="Synthetic frames per run")
+    parser.add_argument("--decision-runs", type=int, default=5, help="is_live_sequence runs per config")
+    parser.add_argument("--fps", type=float, default=30.0, help="Camera rate for decision runs (0 = unpaced)")
+    parser.add_argument("--window", type=float, default=app.LIVENESS_WINDOW_SEC, help="Liveness window (s)")
+    parser.add_argument("--decision-modes", default="sequential,count",
+                        help=f"Comma-separated subset of {','.join(DECISION_MODES)}")
+    parser.add_argument("--variation", type=float, default=2.0,
+                        help="Capture variation of the planted face (0 = the exact enrolled crop)")
+    parser.add_argument("--enroll-shots", type=int, default=5,
+                        help="Varied captures enrolled for the user when --variation is on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+
+    face_img = cv2.imread(args.face) if args.face else None
+    if face_img is not None:
+        face_img = face_crop(face_img)
+    enrolled = enrollment_shots(args, face_img, rng)
+    if not enrolled:
+        print("⚠ No enrollable face image; measuring with distractor templates only")
+
+    results = []
+    for resolution in [tuple(int(v) for v in r.split("x")) for r in args.resolutions.split(",")]:
+        for size in [int(s) for s in args.gallery_sizes.split(",")]:
+            gallery = build_gallery(size, enrolled, rng)
+            matcher = GalleryMatcher(gallery.templates)
+            result = {"source": args.source, "resolution": f"{resolution[0]}x{resolution[1]}",
+                      "gallery_size": len(gallery)}
+            result.update(run_stages(make_source(args, face_img, resolution), matcher))
+            # Same number of templates, none of them the planted face
+            impostors = build_gallery(len(gallery), [], rng)
+            result["decision"] = {
+                mode: {"genuine": run_decisions(args, face_img, resolution, gallery, mode),
+                       "impostor": run_decisions(args, face_img, resolution, impostors, mode)}
+                for mode in args.decision_modes.split(",")}
+            results.append(result)
+
+            stages = result["stages"]
+            print(f"{result['resolution']:>9} gallery {len(gallery):>6}: {result['fps']:6.1f} fps, "
+                  + ", ".join(f"{name} p50/p95/p99 {s['p50']:.2f}/{s['p95']:.2f}/{s['p99']:.2f} ms"
+                              for name, s in stages.items() if s.get("count")))
+            for mode, runs in result["decision"].items():
+                genuine, impostor = runs["genuine"], runs["impostor"]
+                print(f"{'':>26}{mode:>10}: unlock {genuine['median_s']:.2f}s "
+                      f"(match rate {genuine['match_rate']:.2f}), "
+                      f"reject {impostor['median_s']:.2f}s (false accepts {impostor['match_rate']:.2f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - Import and CLI start-up time, and which heavy stacks get loaded
+
+Each measurement runs in a fresh interpreter so nothing is cached in-process.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported when the GUI or DPAPI is actually used
+HEAVY_MODULES = ("tkinter", "PIL", "win32crypt", "cv2")
+
+SCENARIOS = {
+    "import user_face_unlock": [sys.executable, "-c", "import user_face_unlock"],
+    "face_model_manager.py list": [sys.executable, "face_model_manager.py", "list"],
+    "python -c pass (baseline)": [sys.executable, "-c", "pass"],
+}
+
+LOADED_PROBE = (
+    "import sys, json\n"
+    "import {module}\n"
+    "print(json.dumps([m for m in {heavy!r} if m in sys.modules]))\n"
+)
+
+
+def time_command(cmd, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def loaded_modules(module: str):
+    code = LOADED_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR,
+                         capture_output=True, text=True).stdout.strip()
+    return json.loads(out.splitlines()[-1]) if out else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, cmd in SCENARIOS.items():
+        samples = time_command(cmd, args.runs)
+        print(f"{name:<30} median {np.median(samples):7.1f} ms  (min {min(samples):.1f})")
+
+    for module in ("face_model_manager", "user_face_unlock"):
+        print(f"Heavy modules loaded by 'import {module}': {loaded_modules(module)}")
+
+
+if __name__ == "__main__":
+    main()
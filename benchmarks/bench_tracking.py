@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tracking Benchmark - Detection cost and agreement of ROI tracking versus full-frame scans
+
+Runs both detectors on every frame of a recording and reports per-frame
+detection time and how often the tracked boxes differ from full-frame ones.
+
+    python benchmarks/bench_tracking.py --source recording.mp4
+    python benchmarks/bench_tracking.py --source frames/img_%04d.png --interval 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_tracking import FaceTracker, box_iou  # noqa: E402
+from user_face_unlock import MIN_FACE_SIZE, detect_faces  # noqa: E402
+
+
+def boxes_agree(full: np.ndarray, tracked: np.ndarray, min_iou: float) -> bool:
+    """True if every full-frame face has a tracked box overlapping it and vice versa"""
+    if len(full) != len(tracked):
+        return False
+    return all(max((box_iou(tuple(f), tuple(t)) for t in tracked), default=0.0) >= min_iou
+               for f in full)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", required=True,
+                        help="Video file, image sequence pattern, or camera index")
+    parser.add_argument("--frames", type=int, default=0, help="Stop after this many frames (0 = all)")
+    parser.add_argument("--interval", type=int, default=10, help="Full-scan interval for tracking")
+    parser.add_argument("--min-iou", type=float, default=0.5, help="IoU for two boxes to agree")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print(f"❌ Could not open source: {args.source}")
+        return 1
+
+    tracker = FaceTracker(detect_faces, MIN_FACE_SIZE, full_scan_interval=args.interval)
+    full_ms, tracked_ms = [], []
+    frames = disagreements = face_frames = 0
+    while not args.frames or frames < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        t0 = time.perf_counter()
+        full = np.asarray(detect_faces(gray)).reshape(-1, 4)
+        t1 = time.perf_counter()
+        tracked = tracker.detect(gray)
+        t2 = time.perf_counter()
+
+        full_ms.append((t1 - t0) * 1000.0)
+        tracked_ms.append((t2 - t1) * 1000.0)
+        frames += 1
+        face_frames += len(full) > 0
+        disagreements += not boxes_agree(full, tracked, args.min_iou)
+    cap.release()
+
+    if not frames:
+        print("❌ No frames read from source")
+        return 1
+    full_avg, tracked_avg = np.mean(full_ms), np.mean(tracked_ms)
+    print(f"Frames: {frames} ({face_frames} with faces)")
+    print(f"Full-frame detection: {full_avg:.2f} ms/frame (p95 {np.percentile(full_ms, 95):.2f})")
+    print(f"Tracked detection:    {tracked_avg:.2f} ms/frame (p95 {np.percentile(tracked_ms, 95):.2f})")
+    print(f"Speedup: {full_avg / tracked_avg:.1f}x")
+    print(f"Frames where boxes differ: {disagreements} ({100.0 * disagreements / frames:.1f}%)")
+    print(f"Tracker: {tracker.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Soak Test - Memory, thread and latency drift over many lock-screen recognition cycles
+
+Drives recognition headless the way LockScreen does: one shared
+CameraSession, and a new worker thread per attempt that runs
+is_live_sequence against the cached template store. Frames come from a
+looping video file or image folder, or from synthetic frames with a planted
+face, so no camera is needed.
+
+Every --sample-every cycles it records RSS, the traced Python heap,
+thread and file-descriptor counts, and per-cycle latency. At the end it
+compares the last sample window with the first one after warm-up. It
+prints the allocation sites that grew the most, and exits with status 1
+when any growth exceeds its threshold. Small, flat growth at sites that
+build tuples is usually CPython's free lists filling up, not a leak.
+
+    python benchmarks/soak_test.py --face face_model/me.jpg --cycles 2000
+    python benchmarks/soak_test.py --source lobby.mp4 --templates ~/face_templates.dat \\
+        --duration 43200 --output soak.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import user_face_unlock as app  # noqa: E402
+from face_gallery import TemplateGallery  # noqa: E402
+from frame_sources import SyntheticFrameSource, open_source  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (psutil if installed, else /proc)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def open_fds() -> Optional[int]:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def heap_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot without tracemalloc's own and the import system's allocations"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+
+
+def make_source_factory(args):
+    """Return a function building a fresh, looping frame source"""
+    if args.source == "synthetic":
+        face = cv2.imread(args.face)
+        if face is None:
+            raise SystemExit(f"❌ Could not read {args.face}")
+        return lambda: SyntheticFrameSource(face, frames=0, fps=args.fps or None,
+                                             face_scale=args.face_scale)
+    return lambda: open_source(args.source, fps=args.fps or None, loop=True)
+
+
+def prepare_templates(args, workdir: str) -> None:
+    """Point the app at a scratch copy of the template store"""
+    app.TEMPLATE_FILE = os.path.join(workdir, "face_templates.dat")
+    if args.templates:
+        shutil.copyfile(os.path.expanduser(args.templates), app.TEMPLATE_FILE)
+        return
+    features = app.extract_enrollment_features(args.face)
+    if features is None:
+        raise SystemExit(f"❌ No face found in {args.face}")
+    app.save_gallery(TemplateGallery.from_templates([features]))
+
+
+def run_cycle(session: app.CameraSession, window: float) -> app.RecognitionResult:
+    """One LockScreen attempt: a fresh worker thread running a liveness sequence"""
+    outcome = {}
+    cancel = threading.Event()
+
+    def worker():
+        outcome["result"] = app.is_live_sequence(window_sec=window, camera=session, cancel=cancel)
+        app.adapt_templates(outcome["result"])
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    thread.join()
+    return outcome.get("result", app.RecognitionResult(False))
+
+
+def summarize(window: List[float]) -> Dict[str, float]:
+    ms = np.asarray(window) * 1000.0
+    return {"latency_p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "latency_p95_ms": round(float(np.percentile(ms, 95)), 1)}
+
+
+def write_samples(path: str, samples: List[dict]) -> None:
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(samples, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+        writer.writeheader()
+        writer.writerows(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default="synthetic",
+                        help="'synthetic', a video file, an image-sequence pattern, or an image folder")
+    parser.add_argument("--face", help="Face image to plant in synthetic frames and enroll")
+    parser.add_argument("--face-scale", type=float, default=0.8,
+                        help="Size of the planted face relative to the synthetic frame")
+    parser.add_argument("--templates", help="Template file to use (a scratch copy is made)")
+    parser.add_argument("--cycles", type=int, default=1000, help="Recognition cycles to run")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0 = no limit)")
+    parser.add_argument("--window", type=float, default=1.0, help="Liveness window per cycle (seconds)")
+    parser.add_argument("--fps", type=float, default=30, help="Source frame rate (0 = unpaced)")
+    parser.add_argument("--warmup", type=int, default=50, help="Cycles before the baseline sample")
+    parser.add_argument("--sample-every", type=int, default=50, help="Cycles per sample window")
+    parser.add_argument("--adapt", action="store_true", help="Enable online template adaptation")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip heap tracing (less overhead)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    parser.add_argument("--max-heap-growth-mb", type=float, default=20.0)
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--max-fd-growth", type=int, default=5)
+    parser.add_argument("--max-latency-growth", type=float, default=1.5,
+                        help="Allowed ratio of the last window's p50 latency to the first")
+    parser.add_argument("--output", help="Write samples as CSV, or JSON for a .json path")
+    args = parser.parse_args()
+    if not args.templates and not args.face:
+        parser.error("give --face (to enroll) or --templates")
+    if args.source == "synthetic" and not args.face:
+        parser.error("synthetic frames need --face")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    app.TEMPLATE_ADAPTATION = args.adapt
+    workdir = tempfile.mkdtemp(prefix="face_soak_")
+    prepare_templates(args, workdir)
+    session = app.CameraSession(background=False, camera_factory=make_source_factory(args))
+    if not args.no_tracemalloc:
+        tracemalloc.start(10)
+
+    samples, window, unlocked = [], [], 0
+    baseline, baseline_snapshot = None, None
+    start = time.perf_counter()
+    try:
+        for cycle in range(1, args.cycles + 1):
+            t0 = time.perf_counter()
+            unlocked += bool(run_cycle(session, args.window))
+            window.append(time.perf_counter() - t0)
+            if cycle % args.sample_every and cycle != args.warmup:
+                continue
+            rss = rss_bytes()
+            sample = {
+                "cycle": cycle,
+                "elapsed_s": round(time.perf_counter() - start, 1),
+                "rss_mb": round(rss / MB, 2) if rss is not None else None,
+                "heap_mb": (round(tracemalloc.get_traced_memory()[0] / MB, 2)
+                            if tracemalloc.is_tracing() else None),
+                "threads": threading.active_count(),
+                "fds": open_fds(),
+                "unlock_rate": round(unlocked / len(window), 3),
+                **summarize(window),
+            }
+            samples.append(sample)
+            window, unlocked = [], 0
+            if cycle == args.warmup:
+                baseline = sample
+                if tracemalloc.is_tracing():
+                    baseline_snapshot = heap_snapshot()
+                    # The snapshot itself is traced; measure the baseline after taking it
+                    baseline["heap_mb"] = round(tracemalloc.get_traced_memory()[0] / MB, 2)
+            print(f"  cycle {cycle:>6}  rss {sample['rss_mb']} MB  heap {sample['heap_mb']} MB  "
+                  f"threads {sample['threads']}  fds {sample['fds']}  "
+                  f"p50 {sample['latency_p50_ms']:.0f} ms  unlock {sample['unlock_rate']:.2f}")
+            if args.duration and time.perf_counter() - start > args.duration:
+                break
+    except KeyboardInterrupt:
+        print("\n⚠ Interrupted; evaluating the samples so far")
+    finally:
+        session.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output and samples:
+        write_samples(args.output, samples)
+    if baseline is None or samples[-1] is baseline:
+        print("❌ Not enough cycles past the warm-up to compare")
+        return 1
+
+    final = samples[-1]
+    # The baseline window includes warm-up cycles; compare against the first full window after it
+    first = next(s for s in samples if s["cycle"] > baseline["cycle"])
+    checks = [
+        ("RSS growth (MB)", baseline["rss_mb"], final["rss_mb"], args.max_rss_growth_mb, False),
+        ("heap growth (MB)", baseline["heap_mb"], final["heap_mb"], args.max_heap_growth_mb, False),
+        ("thread growth", baseline["threads"], final["threads"], args.max_thread_growth, False),
+        ("fd growth", baseline["fds"], final["fds"], args.max_fd_growth, False),
+        ("p50 latency ratio", first["latency_p50_ms"], final["latency_p50_ms"], args.max_latency_growth, True),
+    ]
+    failed = False
+    print(f"\nCompared cycle {baseline['cycle']} with cycle {final['cycle']}:")
+    for name, before, after, limit, ratio in checks:
+        if before is None or after is None:
+            print(f"  {name:<20} n/a")
+            continue
+        growth = after / before if ratio else after - before
+        ok = growth <= limit
+        failed |= not ok
+        print(f"  {'✓' if ok else '❌'} {name:<20} {growth:8.2f}  (limit {limit})")
+
+    if baseline_snapshot is not None:
+        print("\nTop allocation growth since the baseline:")
+        for stat in heap_snapshot().compare_to(baseline_snapshot, "lineno")[:10]:
+            print(f"  {stat}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
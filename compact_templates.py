@@ -0,0 +1,156 @@
+"""
+Compact Templates - PCA-reduced, int8-quantized templates with approximate scoring
+
+A projection learned from the enrolled gallery maps each normalized
+4096-value template to COMPACT_DIM values, which are stored as int8 codes
+with one float32 scale per template (about 130 bytes instead of 16 KB).
+Queries are projected but not quantized, and scores are computed a chunk
+of templates at a time, so matching reads a fraction of the memory and does
+a fraction of the arithmetic of the full representation.
+"""
+
+import threading
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+from face_matcher import normalize_rows
+
+COMPACT_DIM = 128
+_FIT_MAX_SAMPLES = 2048  # Templates used to learn the projection
+_SCORE_CHUNK_ROWS = 8192
+
+
+class CompactCodec:
+    """
+    Learned orthonormal projection plus int8 quantization. The basis spans
+    the gallery's mean template and its leading principal components, so
+    dot products of projected vectors approximate the full correlations.
+    """
+
+    def __init__(self, components: np.ndarray):
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, normalized: np.ndarray, dim: int = COMPACT_DIM, seed: int = 0) -> "CompactCodec":
+        """Learn the projection from normalized templates (at most one component per template)"""
+        n = normalized.shape[0]
+        if n > _FIT_MAX_SAMPLES:
+            rows = np.sort(np.random.default_rng(seed).choice(n, _FIT_MAX_SAMPLES, replace=False))
+            normalized = normalized[rows]
+        sample = np.asarray(normalized, dtype=np.float32)
+        mean = sample.mean(axis=0)
+        centred = sample - mean
+        # Principal directions from the (samples x samples) Gram matrix, which
+        # is much cheaper to decompose than the sample itself when samples < features
+        eigenvalues, eigenvectors = np.linalg.eigh((centred @ centred.T).astype(np.float64))
+        order = np.argsort(eigenvalues)[::-1]
+        order = order[eigenvalues[order] > eigenvalues.max() * 1e-9][:max(0, dim - 1)]
+        directions = eigenvectors[:, order].T @ centred
+        basis, _ = np.linalg.qr(np.vstack([mean, directions]).T.astype(np.float64))
+        return cls(basis.T)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    def project(self, normalized: np.ndarray) -> np.ndarray:
+        """Project normalized vectors; dot products of projections approximate their correlation"""
+        return (normalized @ self.components.T).astype(np.float32, copy=False)
+
+    def encode(self, normalized: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return int8 codes and per-row scales for normalized vectors"""
+        projected = self.project(normalized)
+        peak = np.abs(projected).max(axis=1)
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        codes = np.rint(projected / scales[:, np.newaxis]).astype(np.int8)
+        return codes, scales
+
+
+class CompactTemplates:
+    """A gallery's templates in compact form: codec, int8 codes and scales"""
+
+    def __init__(self, codec: CompactCodec, codes: np.ndarray, scales: np.ndarray):
+        if codes.shape[0] != scales.shape[0] or codes.shape[1] != codec.dim:
+            raise ValueError("Compact codes, scales and codec do not line up")
+        self.codec = codec
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def from_templates(cls, templates: np.ndarray, dim: int = COMPACT_DIM) -> "CompactTemplates":
+        normalized = normalize_rows(templates)
+        codec = CompactCodec.fit(normalized, dim)
+        return cls(codec, *codec.encode(normalized))
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+
+class CompactMatcher:
+    """
+    Approximate counterpart of GalleryMatcher that scores queries against
+    compact templates. Exposes the same score / best_match interface.
+    """
+
+    index = None
+
+    def __init__(self, compact: CompactTemplates):
+        if len(compact) == 0:
+            raise ValueError("CompactMatcher needs at least one template")
+        self.compact = compact
+        self.template_ids = np.arange(len(compact))
+        self._buffers = threading.local()  # Per-thread widening buffer
+
+    def __len__(self) -> int:
+        return len(self.compact)
+
+    @property
+    def dim(self) -> int:
+        return self.compact.codec.input_dim
+
+    @property
+    def comparisons_per_query(self) -> int:
+        return len(self)
+
+    def _project(self, features: Union[Sequence[np.ndarray], np.ndarray]) -> np.ndarray:
+        queries = np.asarray(features, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        return self.compact.codec.project(normalize_rows(queries))
+
+    def _raw_scores(self, projected: np.ndarray) -> np.ndarray:
+        codes, scales = self.compact.codes, self.compact.scales
+        out = np.empty((projected.shape[0], codes.shape[0]), dtype=np.float32)
+        # Widen one chunk of codes at a time into a small reused float buffer
+        rows = min(_SCORE_CHUNK_ROWS, codes.shape[0])
+        buffer = getattr(self._buffers, "buffer", None)
+        if buffer is None or buffer.shape[0] < rows:
+            buffer = self._buffers.buffer = np.empty((rows, codes.shape[1]), dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORE_CHUNK_ROWS):
+            chunk = codes[start:start + _SCORE_CHUNK_ROWS]
+            widened = buffer[:chunk.shape[0]]
+            widened[:] = chunk
+            np.matmul(projected, widened.T, out=out[:, start:start + chunk.shape[0]])
+        out *= scales
+        return out
+
+    def score(self, features: Union[Sequence[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Approximate (faces x templates) similarity matrix, clamped to [0, 1] like compare_faces"""
+        return np.clip(self._raw_scores(self._project(features)), 0.0, 1.0)
+
+    def best_match(self, features: Union[Sequence[np.ndarray], np.ndarray],
+                   exhaustive: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best template index and its approximate score for each face"""
+        raw = self._raw_scores(self._project(features))
+        rows = np.argmax(raw, axis=1)
+        return rows, np.clip(raw[np.arange(raw.shape[0]), rows], 0.0, 1.0)
+
@@ -0,0 +1,80 @@
+"""
+Face Async - asyncio interface to the recognition engine
+
+Capture, detection and matching run in an executor thread; the coroutine
+only waits on them, so an event loop stays responsive and an attempt can
+be cancelled (or time out) mid-flight, which stops the camera loop at the
+next frame instead of letting it run to the end of its window.
+
+    result = await authenticate(timeout=10)
+
+    async for event in authenticate_events():
+        print(event.stage, event.user_id, event.similarity)
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Optional, Union
+
+import user_face_unlock as app
+from face_gallery import TemplateGallery
+from face_matcher import GalleryMatcher
+from user_face_unlock import RecognitionProgress, RecognitionResult
+
+
+async def authenticate(camera=None,
+                       gallery: Optional[TemplateGallery] = None,
+                       matcher: Optional[GalleryMatcher] = None,
+                       window_sec: float = app.LIVENESS_WINDOW_SEC,
+                       matches_required: Optional[int] = None,
+                       timeout: Optional[float] = None,
+                       on_progress: Optional[Callable[[RecognitionProgress], None]] = None,
+                       executor: Optional[Executor] = None) -> RecognitionResult:
+    """
+    Run one liveness sequence without blocking the event loop.
+
+    `on_progress` is called on the event loop's thread for each progress
+    event. Cancelling the task or exceeding `timeout` (asyncio.TimeoutError)
+    stops the recognition thread and releases the camera before returning.
+    """
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+
+    def progress(event: RecognitionProgress):
+        if on_progress is not None:
+            loop.call_soon_threadsafe(on_progress, event)
+
+    future = loop.run_in_executor(
+        executor, lambda: app.is_live_sequence(matches_required, window_sec, camera=camera,
+                                               gallery=gallery, matcher=matcher,
+                                               cancel=cancel, progress=progress))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        cancel.set()
+        # Let the worker notice the flag and release the camera before propagating
+        await asyncio.gather(future, return_exceptions=True)
+        raise
+
+
+async def authenticate_events(timeout: Optional[float] = None,
+                              **kwargs) -> AsyncIterator[Union[RecognitionProgress, RecognitionResult]]:
+    """
+    Stream progress events of one attempt, followed by its RecognitionResult.
+    Closing the iterator early cancels the attempt.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(authenticate(timeout=timeout, on_progress=events.put_nowait, **kwargs))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        yield task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
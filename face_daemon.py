@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Face Daemon - Long-lived local authentication service
+
+Keeps the detector, the decoded gallery and a pool of worker processes warm
+so each unlock only pays for recognition, not for start-up. Clients talk to
+it over a Unix socket with one JSON object per line:
+
+    {"cmd": "authenticate", "source": 0, "window_sec": 5}
+    {"cmd": "identify", "image": "<base64 JPEG/PNG>"}
+    {"cmd": "enroll", "folder": "face_model"}
+    {"cmd": "reload"}
+    {"cmd": "status"}
+
+Workers read one gallery published in shared memory instead of each
+holding their own copy.
+
+    python face_daemon.py serve
+    python face_daemon.py authenticate [camera index or video file]
+"""
+
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import user_face_unlock as app
+from compact_templates import CompactMatcher, CompactTemplates
+from face_gallery import TemplateGallery
+from face_matcher import GalleryMatcher
+from frame_sources import open_source
+
+DAEMON_SOCKET = os.path.join(os.path.expanduser("~"), ".face_unlock.sock")
+DAEMON_WORKERS = 2  # Concurrent authentications / frame streams
+DAEMON_REQUEST_TIMEOUT = 60.0
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment, but pool workers share the
+        # daemon's resource tracker, which already owns it, so this is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedGallery:
+    """
+    A gallery published to shared memory by the daemon: one segment holds the
+    matcher's normalized templates (in index list order), or its int8 codes
+    for a CompactMatcher, and another the pickled user IDs, labels and index
+    (or projection and scales). Workers only receive the small `ref` with
+    each request and read the segments once per version.
+
+    The daemon counts the requests using a gallery (`users`) and only
+    unlinks it once it is retired and the last of them has finished.
+    """
+
+    def __init__(self, gallery: TemplateGallery, matcher, version: int):
+        meta = {
+            "user_ids": gallery.user_ids,
+            # Owner of each shared row, following the matcher's row order
+            "labels": gallery.labels[matcher.template_ids],
+            # Calibrates the sequential decision; compact galleries cannot recompute it
+            "genuine_scores": gallery.leave_one_out_scores(),
+        }
+        if isinstance(matcher, CompactMatcher):
+            templates = matcher.compact.codes
+            meta.update(codec=matcher.compact.codec, scales=np.asarray(matcher.compact.scales))
+        else:
+            templates = matcher.templates
+            meta.update(index=matcher.index, nprobe=matcher.nprobe)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, templates.nbytes))
+        view = np.ndarray(templates.shape, dtype=templates.dtype, buffer=self.shm.buf)
+        view[:] = templates
+        meta = pickle.dumps(meta)
+        self.meta_shm = shared_memory.SharedMemory(create=True, size=len(meta))
+        self.meta_shm.buf[:len(meta)] = meta
+        self.users = 0
+        self.retired = False
+        self.ref = {"version": version, "shape": templates.shape, "dtype": templates.dtype.str,
+                    "shm_name": self.shm.name, "meta_name": self.meta_shm.name,
+                    "meta_size": len(meta)}
+
+    def close(self):
+        for shm in (self.shm, self.meta_shm):
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# Per-worker view of the shared gallery, replaced when the daemon publishes a new version
+_worker_state: Dict[str, Any] = {"version": None}
+
+
+def _init_worker():
+    # One OpenCV thread per worker; concurrency comes from the pool itself
+    app.cv2.setNumThreads(1)
+    # Warm the detector so the first request does not pay for it
+    app.detect_faces(np.zeros((120, 160), dtype=np.uint8))
+
+
+def _worker_gallery(ref: Dict[str, Any]):
+    """Return (gallery, matcher) backed by the shared matrix, attaching on version change"""
+    if _worker_state["version"] != ref["version"]:
+        old = _worker_state.get("shm")
+        _worker_state.clear()
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                # A result still references the old matrix; it is freed with it
+                pass
+        meta_shm = _attach_shared_memory(ref["meta_name"])
+        meta = pickle.loads(bytes(meta_shm.buf[:ref["meta_size"]]))
+        meta_shm.close()
+        shm = _attach_shared_memory(ref["shm_name"])
+        templates = np.ndarray(ref["shape"], dtype=np.dtype(ref["dtype"]), buffer=shm.buf)
+        templates.flags.writeable = False
+        if "codec" in meta:
+            matcher = CompactMatcher(CompactTemplates(meta["codec"], templates, meta["scales"]))
+            # Only user lookups are needed from the gallery; it carries no full templates
+            gallery = TemplateGallery(meta["user_ids"],
+                                      np.zeros((len(meta["labels"]), 0), dtype=np.float32),
+                                      meta["labels"])
+        else:
+            matcher = GalleryMatcher.from_normalized(templates, meta["index"], meta["nprobe"])
+            gallery = TemplateGallery(meta["user_ids"], templates, meta["labels"])
+        gallery.genuine_scores = meta["genuine_scores"]
+        _worker_state.update(version=ref["version"], shm=shm, gallery=gallery, matcher=matcher)
+    return _worker_state["gallery"], _worker_state["matcher"]
+
+
+def _authenticate_task(ref: Dict[str, Any], source, window_sec: float,
+                       matches_required: Optional[int], cancel=None) -> Dict[str, Any]:
+    gallery, matcher = _worker_gallery(ref)
+    if isinstance(source, int):
+        camera = app.CameraManager(source, background=app.CAMERA_BACKGROUND_CAPTURE)
+    else:
+        camera = open_source(source)
+    started = time.perf_counter()
+    result = app.is_live_sequence(matches_required, window_sec, camera=camera,
+                                  gallery=gallery, matcher=matcher, cancel=cancel)
+    return {"matched": result.matched, "user_id": result.user_id,
+            "similarity": result.similarity, "matches": result.matches,
+            "cancelled": result.cancelled, "seconds": time.perf_counter() - started}
+
+
+def _identify_task(ref: Dict[str, Any], image: bytes) -> Dict[str, Any]:
+    gallery, matcher = _worker_gallery(ref)
+    frame = app.cv2.imdecode(np.frombuffer(image, dtype=np.uint8), app.cv2.IMREAD_COLOR)
+    if frame is None:
+        return {"error": "Could not decode image"}
+    best_idx, best_scores = app.process_frame(frame, matcher)
+    return {"faces": [{"user_id": gallery.user_for(idx), "similarity": float(score),
+                       "matched": bool(score >= app.TOLERANCE)}
+                      for idx, score in zip(best_idx, best_scores)]}
+
+
+class FaceDaemon:
+    """Owns the worker pool and the published gallery"""
+
+    def __init__(self, workers: int = DAEMON_WORKERS):
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self._lock = threading.Lock()
+        self._shared: Optional[SharedGallery] = None
+        self._published_matcher = None
+        self._version = 0
+        # Cancel events a timed-out request can set in its worker process
+        self._manager = multiprocessing.Manager()
+        self.requests = 0
+
+    def _publish(self, force: bool = False) -> Optional[SharedGallery]:
+        """Publish the current gallery if it changed on disk (or when forced); call with _lock held"""
+        if force:
+            app.template_cache.invalidate()
+        gallery, matcher = app.get_cached_gallery()
+        if not gallery:
+            return None
+        if matcher is not self._published_matcher:
+            self._version += 1
+            old = self._shared
+            self._shared = SharedGallery(gallery, matcher, self._version)
+            self._published_matcher = matcher
+            if old is not None:
+                # Requests still using the old gallery keep it until they finish;
+                # workers drop their old mapping on their next request
+                old.retired = True
+                if not old.users:
+                    old.close()
+            logging.info(f"Published gallery v{self._version}: {len(gallery)} templates")
+        return self._shared
+
+    def _gallery_ref(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            shared = self._publish(force)
+            return shared.ref if shared is not None else None
+
+    def _acquire_gallery(self) -> Optional[SharedGallery]:
+        """Publish if needed and hold the gallery until _release_gallery()"""
+        with self._lock:
+            shared = self._publish()
+            if shared is not None:
+                shared.users += 1
+            return shared
+
+    def _release_gallery(self, shared: SharedGallery) -> None:
+        with self._lock:
+            shared.users -= 1
+            if shared.retired and not shared.users:
+                shared.close()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            requests = self.requests
+        cmd = request.get("cmd")
+        if cmd == "status":
+            return {"ok": True, "requests": requests, "gallery_version": self._version,
+                    "template_cache": app.template_cache.stats()}
+        if cmd == "reload":
+            ref = self._gallery_ref(force=True)
+            return {"ok": ref is not None, "gallery_version": self._version}
+        if cmd == "enroll":
+            ok = app.enroll_all_images_in_folder(request.get("folder", "face_model"),
+                                                 request.get("user_id", app.DEFAULT_USER_ID))
+            self._gallery_ref(force=True)
+            return {"ok": ok, "gallery_version": self._version}
+
+        if cmd not in ("authenticate", "identify"):
+            return {"ok": False, "error": f"Unknown command: {cmd}"}
+        shared = self._acquire_gallery()
+        if shared is None:
+            return {"ok": False, "error": "No templates enrolled"}
+        cancel = None
+        try:
+            if cmd == "authenticate":
+                cancel = self._manager.Event()
+                matches_required = request.get("matches_required")
+                future = self.pool.submit(
+                    _authenticate_task, shared.ref, request.get("source", app.CAMERA_INDEX),
+                    float(request.get("window_sec", app.LIVENESS_WINDOW_SEC)),
+                    int(matches_required) if matches_required is not None else None, cancel)
+            else:
+                future = self.pool.submit(_identify_task, shared.ref,
+                                          base64.b64decode(request["image"]))
+        except Exception:
+            self._release_gallery(shared)
+            raise
+        # The gallery stays published until the task is done, not just until we stop waiting
+        future.add_done_callback(lambda _: self._release_gallery(shared))
+        try:
+            result = future.result(timeout=DAEMON_REQUEST_TIMEOUT)
+        except FutureTimeoutError:
+            if cancel is not None:
+                # Stop the worker at its next frame so it frees the camera
+                cancel.set()
+            return {"ok": False, "error": f"Request timed out after {DAEMON_REQUEST_TIMEOUT:.0f} s"}
+        result.setdefault("ok", "error" not in result)
+        return result
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+        self._manager.shutdown()
+        if self._shared is not None:
+            self._shared.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.face_daemon.handle(json.loads(line))
+            except Exception as e:
+                logging.error(f"Daemon request failed: {e}")
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str = DAEMON_SOCKET, workers: int = DAEMON_WORKERS):
+    """Run the daemon until interrupted"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    daemon = FaceDaemon(workers)
+    # Start the workers and publish the gallery before the first client arrives
+    daemon._gallery_ref()
+    server = _Server(socket_path, _RequestHandler, bind_and_activate=False)
+    # Create the socket owner-only, and make sure of it before accepting connections
+    umask = os.umask(0o177)
+    try:
+        server.server_bind()
+    finally:
+        os.umask(umask)
+    os.chmod(socket_path, 0o600)
+    server.server_activate()
+    server.face_daemon = daemon
+    logging.info(f"Face daemon listening on {socket_path} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.shutdown()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class DaemonClient:
+    """Minimal client for the daemon's line-delimited JSON protocol"""
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET, timeout: float = DAEMON_REQUEST_TIMEOUT):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self._reader = self.sock.makefile("rb")
+
+    def request(self, cmd: str, **params) -> Dict[str, Any]:
+        params["cmd"] = cmd
+        self.sock.sendall(json.dumps(params).encode("utf-8") + b"\n")
+        return json.loads(self._reader.readline())
+
+    def authenticate(self, source=app.CAMERA_INDEX, window_sec: float = app.LIVENESS_WINDOW_SEC):
+        return self.request("authenticate", source=source, window_sec=window_sec)
+
+    def identify(self, image_bytes: bytes):
+        return self.request("identify", image=base64.b64encode(image_bytes).decode("ascii"))
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ["-h", "--help", "help"]:
+        print("Face Daemon - Usage:")
+        print(f"  Serve:         python {sys.argv[0]} serve")
+        print(f"  Authenticate:  python {sys.argv[0]} authenticate [camera index | video file]")
+        print(f"  Enroll:        python {sys.argv[0]} enroll [folder]")
+        print(f"  Reload/status: python {sys.argv[0]} reload | status")
+        return
+
+    cmd = sys.argv[1]
+    if cmd == "serve":
+        serve()
+        return
+
+    params = {}
+    if cmd == "authenticate" and len(sys.argv) >= 3:
+        params["source"] = int(sys.argv[2]) if sys.argv[2].isdigit() else sys.argv[2]
+    elif cmd == "enroll" and len(sys.argv) >= 3:
+        params["folder"] = sys.argv[2]
+    try:
+        with DaemonClient() as client:
+            print(json.dumps(client.request(cmd, **params), indent=2))
+    except OSError as e:
+        print(f"❌ Could not reach the face daemon at {DAEMON_SOCKET}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Face Detectors - Interchangeable CPU face detection backends
+
+Every backend takes a grayscale frame and returns (x, y, w, h) boxes:
+
+- haar:  OpenCV Haar cascade (default, ships with opencv-python)
+- lbp:   LBP cascade from a local XML file; faster, somewhat less accurate
+- yunet: OpenCV's YuNet CNN detector (cv2.FaceDetectorYN) from a local ONNX
+         model file; most accurate, needs OpenCV >= 4.5.4
+
+Any backend can be wrapped in DownscaledDetector, which detects on a
+smaller copy of the frame and maps the boxes back to full resolution.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"
+# Not included in the opencv-python wheels; download from the OpenCV repository (data/lbpcascades)
+LBP_CASCADE_FILE = "lbpcascade_frontalface_improved.xml"
+# From the OpenCV model zoo (models/face_detection_yunet)
+YUNET_MODEL_FILE = "face_detection_yunet_2023mar.onnx"
+
+_NO_FACES = np.zeros((0, 4), dtype=np.int32)
+
+
+class FaceDetector:
+    """Base class: detect() returns an (N x 4) array of (x, y, w, h) boxes"""
+
+    name = "base"
+
+    def detect(self, gray: np.ndarray, min_size: Tuple[int, int] = (0, 0),
+               max_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Backend and parameters, e.g. for cache keys; changes whenever results could"""
+        return self.name
+
+
+class CascadeDetector(FaceDetector):
+    """Haar or LBP cascade classifier"""
+
+    def __init__(self, cascade_file: str, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 name: str = "cascade"):
+        self.cascade = cv2.CascadeClassifier(cascade_file)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Could not load cascade: {cascade_file}")
+        self.cascade_file = cascade_file
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.name = name
+
+    def detect(self, gray, min_size=(0, 0), max_size=None):
+        faces = self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=min_size,
+            maxSize=max_size or (0, 0)
+        )
+        return faces if len(faces) else _NO_FACES
+
+    def describe(self):
+        return (f"{self.name}|{os.path.basename(self.cascade_file)}"
+                f"|{self.scale_factor}|{self.min_neighbors}")
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV's YuNet CNN face detector"""
+
+    name = "yunet"
+
+    def __init__(self, model_file: str = YUNET_MODEL_FILE, score_threshold: float = 0.8,
+                 nms_threshold: float = 0.3, top_k: int = 50):
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError("The yunet backend needs OpenCV 4.5.4 or newer")
+        if not os.path.isfile(model_file):
+            raise FileNotFoundError(f"YuNet model not found: {model_file}")
+        self.model_file = model_file
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.detector = cv2.FaceDetectorYN.create(model_file, "", (320, 320),
+                                                  score_threshold, nms_threshold, top_k)
+        self._input_size = (320, 320)
+
+    def detect(self, gray, min_size=(0, 0), max_size=None):
+        height, width = gray.shape[:2]
+        if self._input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self._input_size = (width, height)
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR) if gray.ndim == 2 else gray
+        _, detections = self.detector.detect(image)
+        if detections is None:
+            return _NO_FACES
+        boxes = np.round(detections[:, :4]).astype(np.int32)
+        # Clip to the frame; YuNet boxes can extend past the edges
+        x0 = np.clip(boxes[:, 0], 0, width)
+        y0 = np.clip(boxes[:, 1], 0, height)
+        x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+        y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+        boxes = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+        keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+        if max_size:
+            keep &= (boxes[:, 2] <= max_size[0]) & (boxes[:, 3] <= max_size[1])
+        return boxes[keep]
+
+    def describe(self):
+        return f"{self.name}|{os.path.basename(self.model_file)}|{self.score_threshold}|{self.nms_threshold}"
+
+
+class DownscaledDetector(FaceDetector):
+    """Runs another detector on a downscaled frame and maps boxes back"""
+
+    def __init__(self, detector: FaceDetector, scale: float):
+        if not 0 < scale <= 1:
+            raise ValueError("scale must be in (0, 1]")
+        self.detector = detector
+        self.scale = scale
+        self.name = f"{detector.name}@{scale:g}"
+
+    def detect(self, gray, min_size=(0, 0), max_size=None):
+        if self.scale == 1:
+            return self.detector.detect(gray, min_size, max_size)
+        small = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        scaled_min = tuple(max(1, int(v * self.scale)) for v in min_size)
+        scaled_max = tuple(int(v * self.scale) for v in max_size) if max_size else None
+        faces = self.detector.detect(small, scaled_min, scaled_max)
+        if len(faces) == 0:
+            return _NO_FACES
+        boxes = np.round(np.asarray(faces, dtype=np.float32) / self.scale).astype(np.int32)
+        height, width = gray.shape[:2]
+        boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+        boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+        return boxes
+
+    def describe(self):
+        return f"{self.detector.describe()}|scale={self.scale:g}"
+
+
+BACKENDS = ("haar", "lbp", "yunet")
+
+
+def create_detector(backend: str = "haar", scale: float = 1.0, **params) -> FaceDetector:
+    """
+    Build a detector by backend name. `params` go to the backend
+    (scale_factor / min_neighbors / cascade_file for cascades; model_file /
+    score_threshold / nms_threshold for yunet). A `scale` below 1 detects
+    on a downscaled frame.
+    """
+    if backend == "haar":
+        cascade_file = params.pop("cascade_file", cv2.data.haarcascades + HAAR_CASCADE)
+        detector = CascadeDetector(cascade_file, name="haar", **params)
+    elif backend == "lbp":
+        detector = CascadeDetector(params.pop("cascade_file", LBP_CASCADE_FILE), name="lbp", **params)
+    elif backend == "yunet":
+        detector = YuNetDetector(**params)
+    else:
+        raise ValueError(f"Unknown detector backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    if scale != 1.0:
+        detector = DownscaledDetector(detector, scale)
+    return detector
@@ -0,0 +1,117 @@
+"""
+Face Gallery - Multi-identity template gallery mapping user IDs to templates
+"""
+
+import getpass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from face_matcher import normalize_rows
+
+# Identity used for templates enrolled before galleries carried user IDs
+try:
+    DEFAULT_USER_ID = getpass.getuser()
+except Exception:
+    DEFAULT_USER_ID = "default"
+
+
+class TemplateGallery:
+    """
+    Enrolled templates for any number of users.
+
+    All templates live in one (templates x features) float32 matrix; `labels`
+    holds the index into `user_ids` of the user that owns each row.
+    """
+
+    def __init__(self, user_ids: Sequence[str], templates: np.ndarray, labels: np.ndarray):
+        self.user_ids = list(user_ids)
+        self.templates = np.ascontiguousarray(templates, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        if self.templates.ndim != 2 or self.templates.shape[0] != self.labels.shape[0]:
+            raise ValueError("Template matrix and labels do not line up")
+        # CompactTemplates stored alongside the matrix (see compact_templates.py),
+        # set when loaded from a store that has them
+        self.compact = None
+        # template_store.JournalState: template IDs and journal bookkeeping,
+        # set when loaded from a template store
+        self.journal = None
+        # Leave-one-out best-match scores (see leave_one_out_scores), computed on
+        # first use or carried over when the gallery holds no full templates
+        self.genuine_scores = None
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Sequence[np.ndarray]]) -> "TemplateGallery":
+        """Build a gallery from {user_id: [feature vectors]}"""
+        user_ids = []
+        rows = []
+        labels = []
+        for user_id, user_templates in mapping.items():
+            if len(user_templates) == 0:
+                continue
+            label = len(user_ids)
+            user_ids.append(str(user_id))
+            for template in user_templates:
+                rows.append(np.asarray(template, dtype=np.float32).ravel())
+                labels.append(label)
+        if not rows:
+            return cls.empty()
+        return cls(user_ids, np.stack(rows), np.array(labels, dtype=np.int32))
+
+    @classmethod
+    def from_templates(cls, templates: Sequence[np.ndarray],
+                       user_id: str = DEFAULT_USER_ID) -> "TemplateGallery":
+        """Build a single-user gallery, e.g. from a legacy anonymous template list"""
+        return cls.from_mapping({user_id: templates})
+
+    @classmethod
+    def empty(cls, dim: int = 0) -> "TemplateGallery":
+        return cls([], np.zeros((0, dim), dtype=np.float32), np.zeros(0, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return self.templates.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.templates.shape[1]
+
+    def user_for(self, template_idx: int) -> str:
+        """Return the user ID that owns a template row"""
+        return self.user_ids[self.labels[template_idx]]
+
+    def templates_for(self, user_id: str) -> np.ndarray:
+        """Return all templates enrolled for one user"""
+        if user_id not in self.user_ids:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self.templates[self.labels == self.user_ids.index(user_id)]
+
+    def leave_one_out_scores(self) -> np.ndarray:
+        """
+        Best score of each template against the other templates of its own user,
+        the way a live capture is scored against the gallery. Users with a single
+        template contribute nothing.
+        """
+        if self.genuine_scores is None:
+            scores = []
+            counts = np.bincount(self.labels, minlength=len(self.user_ids))
+            if self.dim:
+                for label in np.flatnonzero(counts >= 2):
+                    user_templates = normalize_rows(self.templates[self.labels == label])
+                    similarity = user_templates @ user_templates.T
+                    np.fill_diagonal(similarity, -np.inf)
+                    scores.append(np.maximum(similarity.max(axis=1), 0.0))
+            self.genuine_scores = (np.concatenate(scores) if scores
+                                   else np.zeros(0, dtype=np.float32))
+        return self.genuine_scores
+
+    def to_mapping(self) -> Dict[str, List[np.ndarray]]:
+        """Return the gallery as {user_id: [feature vectors]}"""
+        return {user_id: list(self.templates_for(user_id)) for user_id in self.user_ids}
+
+    def with_user(self, user_id: str, templates: Optional[Sequence[np.ndarray]]) -> "TemplateGallery":
+        """Return a copy where one user's templates are replaced (or removed when empty)"""
+        mapping = self.to_mapping()
+        mapping.pop(user_id, None)
+        if templates is not None and len(templates) > 0:
+            mapping[user_id] = list(templates)
+        return TemplateGallery.from_mapping(mapping)
@@ -0,0 +1,187 @@
+"""
+Face Matcher - Vectorized similarity scoring against enrolled templates
+"""
+
+import logging
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Galleries at least this large are searched through an IVF index instead of exhaustively
+INDEX_MIN_TEMPLATES = 2048
+INDEX_NPROBE = 8  # Number of inverted lists scanned per query
+INDEX_TRAIN_SAMPLES = 20000  # Cap on vectors used to train the coarse centroids
+INDEX_KMEANS_ITERATIONS = 10
+
+_NORMALIZE_CHUNK_ROWS = 4096
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Center each row and scale it to unit length (zero-variance rows become all zeros)"""
+    vectors = np.asarray(vectors)
+    out = np.empty(vectors.shape, dtype=np.float32)
+    # Work in float64 a chunk at a time to keep precision without doubling peak memory
+    for start in range(0, vectors.shape[0], _NORMALIZE_CHUNK_ROWS):
+        chunk = vectors[start:start + _NORMALIZE_CHUNK_ROWS].astype(np.float64)
+        chunk -= chunk.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        np.divide(chunk, norms, out=chunk, where=norms > 0)
+        chunk[norms[:, 0] == 0] = 0.0
+        out[start:start + _NORMALIZE_CHUNK_ROWS] = chunk
+    return out
+
+
+def _train_centroids(vectors: np.ndarray, nlist: int, iterations: int,
+                     rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means on a sample of normalized vectors"""
+    n = vectors.shape[0]
+    sample = vectors[np.sort(rng.choice(n, min(n, INDEX_TRAIN_SAMPLES), replace=False))]
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        one_hot = np.zeros((sample.shape[0], nlist), dtype=np.float32)
+        one_hot[np.arange(sample.shape[0]), assign] = 1.0
+        sums = one_hot.T @ sample
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        filled = norms[:, 0] > 0
+        centroids[filled] = sums[filled] / norms[filled]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-list index over normalized vectors for sub-linear nearest-neighbour search.
+
+    Vectors are clustered around `nlist` coarse centroids and stored grouped by
+    cluster; a query only scans the `nprobe` lists whose centroids it is closest to.
+    """
+
+    def __init__(self, vectors: np.ndarray, nlist: Optional[int] = None,
+                 iterations: int = INDEX_KMEANS_ITERATIONS, seed: int = 0):
+        n = vectors.shape[0]
+        if nlist is None:
+            nlist = int(round(np.sqrt(n)))
+        nlist = max(1, min(nlist, n))
+        self.centroids = _train_centroids(vectors, nlist, iterations,
+                                          np.random.default_rng(seed))
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + _NORMALIZE_CHUNK_ROWS] @ self.centroids.T, axis=1)
+            for start in range(0, n, _NORMALIZE_CHUNK_ROWS)])
+        # Permutation that groups vectors by list; offsets delimit each list
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.searchsorted(assign[self.order], np.arange(nlist + 1))
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    def search(self, queries: np.ndarray, grouped_vectors: np.ndarray,
+               nprobe: int = INDEX_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best row of `grouped_vectors` (list order) and its score for each query"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        best_rows = np.zeros(queries.shape[0], dtype=np.int64)
+        best_scores = np.full(queries.shape[0], -np.inf, dtype=np.float32)
+        for q, query in enumerate(queries):
+            for lst in probes[q]:
+                start, end = self.offsets[lst], self.offsets[lst + 1]
+                if start == end:
+                    continue
+                scores = grouped_vectors[start:end] @ query
+                top = int(np.argmax(scores))
+                if scores[top] > best_scores[q]:
+                    best_scores[q] = scores[top]
+                    best_rows[q] = start + top
+        return best_rows, best_scores
+
+
+class GalleryMatcher:
+    """
+    Scores face features against every enrolled template with a single matrix product.
+
+    Templates are centered and L2-normalized once, so the dot product of a
+    normalized query with a template row is exactly the Pearson correlation
+    that compare_faces computes pair by pair. Large galleries additionally get
+    an IVF index so best_match stays sub-linear in the number of templates.
+    """
+
+    def __init__(self, templates: Union[Sequence[np.ndarray], np.ndarray],
+                 use_index: Optional[bool] = None, nlist: Optional[int] = None,
+                 nprobe: int = INDEX_NPROBE):
+        matrix = np.asarray(templates, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        if matrix.ndim != 2 or matrix.shape[0] == 0:
+            raise ValueError("GalleryMatcher needs at least one template vector")
+        self.templates = normalize_rows(matrix)
+        # Original template index of each row of self.templates
+        self.template_ids = np.arange(matrix.shape[0])
+        self.nprobe = nprobe
+        self.index = None
+
+        if use_index is None:
+            use_index = matrix.shape[0] >= INDEX_MIN_TEMPLATES
+        if use_index:
+            self.index = IVFIndex(self.templates, nlist=nlist)
+            self.templates = self.templates[self.index.order]
+            self.template_ids = self.index.order
+            logging.info(
+                f"Built IVF index with {self.index.nlist} lists over {len(self)} templates")
+
+    @classmethod
+    def from_normalized(cls, templates: np.ndarray, index: Optional[IVFIndex] = None,
+                        nprobe: int = INDEX_NPROBE) -> "GalleryMatcher":
+        """
+        Wrap an already-normalized template matrix without copying it, e.g. a
+        view of shared memory. Rows must already be in `index` list order.
+        """
+        matcher = cls.__new__(cls)
+        matcher.templates = templates
+        matcher.template_ids = np.arange(templates.shape[0])
+        matcher.nprobe = nprobe
+        matcher.index = index
+        return matcher
+
+    def __len__(self) -> int:
+        return self.templates.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.templates.shape[1]
+
+    @property
+    def comparisons_per_query(self) -> int:
+        """Template vectors scored for each face (an average when an index is used)"""
+        if self.index is None:
+            return len(self)
+        scanned = len(self) * min(self.nprobe, self.index.nlist) // self.index.nlist
+        return self.index.nlist + scanned
+
+    def _prepare(self, features: Union[Sequence[np.ndarray], np.ndarray]) -> np.ndarray:
+        queries = np.asarray(features, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        return normalize_rows(queries)
+
+    def score(self, features: Union[Sequence[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Return a (faces x templates) matrix of similarity scores (0-1, higher = more similar)"""
+        raw = self._prepare(features) @ self.templates.T
+        scores = np.empty_like(raw)
+        scores[:, self.template_ids] = raw
+        # Same clamping as compare_faces: negative correlation counts as no match
+        np.maximum(scores, 0.0, out=scores)
+        return scores
+
+    def best_match(self, features: Union[Sequence[np.ndarray], np.ndarray],
+                   exhaustive: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best template index and its score for each face"""
+        queries = self._prepare(features)
+        if self.index is not None and not exhaustive:
+            rows, best_scores = self.index.search(queries, self.templates, self.nprobe)
+        else:
+            raw = queries @ self.templates.T
+            rows = np.argmax(raw, axis=1)
+            best_scores = raw[np.arange(raw.shape[0]), rows]
+        return self.template_ids[rows], np.maximum(best_scores, 0.0)
@@ -5,7 +5,12 @@ Face Model Manager - Helper script to manage face enrollments
 
 import os
 import sys
-from user_face_unlock import enroll_from_image
+
+
+def enroll_from_image(image_path):
+    """Enroll one image; the recognition stack (OpenCV, templates) is only imported here"""
+    from user_face_unlock import enroll_from_image as enroll_image
+    return enroll_image(image_path)
 
 
 def list_face_models():
@@ -62,6 +67,30 @@ def enroll_by_number(image_number):
     return success
 
 
+def dedup_templates(apply: bool = False):
+    """Report (and with apply, save) the enrolled gallery with near-duplicate templates merged"""
+    import user_face_unlock as app
+    from template_dedup import dedup_gallery
+
+    gallery = app.load_gallery()
+    if not gallery:
+        print("❌ No enrolled templates found!")
+        return False
+    deduped, report = dedup_gallery(gallery, app.ENROLL_DEDUP_SIMILARITY,
+                                    app.ENROLL_MAX_TEMPLATES_PER_USER, app.TOLERANCE)
+    # Release the memory-mapped file before save_gallery replaces it (Windows)
+    del gallery
+    for user_id, (before, after) in report.per_user.items():
+        print(f"  {user_id}: {before} -> {after} templates")
+    print(f"📉 {report.summary()}")
+    if apply:
+        app.save_gallery(deduped)
+        print("✅ Deduplicated templates saved.")
+    else:
+        print("Run with --apply to save the deduplicated templates.")
+    return True
+
+
 def main():
     """Main function"""
     if len(sys.argv) == 1:
@@ -72,6 +101,7 @@ def main():
         print("  python face_model_manager.py list                    # List all images")
         print("  python face_model_manager.py enroll <number>         # Enroll by number")
         print("  python face_model_manager.py enroll <filename>       # Enroll by filename")
+        print("  python face_model_manager.py dedup [--apply]         # Merge near-duplicate templates")
         print("\nExample:")
         print("  python face_model_manager.py enroll 1")
         print("  python face_model_manager.py enroll WIN_20250905_22_02_17_Pro.jpg")
@@ -79,6 +109,9 @@ def main():
     elif len(sys.argv) == 2 and sys.argv[1] == "list":
         show_face_models()
 
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "dedup":
+        dedup_templates(apply=sys.argv[2:] == ["--apply"])
+
     elif len(sys.argv) == 3 and sys.argv[1] == "enroll":
         arg = sys.argv[2]
 
@@ -0,0 +1,121 @@
+"""
+Face Tracking - Region-of-interest detection between periodic full-frame scans
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# detect(gray, min_size, max_size) -> array of (x, y, w, h) boxes
+DetectFn = Callable[[np.ndarray, Tuple[int, int], Optional[Tuple[int, int]]], np.ndarray]
+
+FULL_SCAN_INTERVAL = 10  # Processed frames between forced full-frame scans
+ROI_MARGIN = 0.5  # ROI grows by this fraction of the face size on every side
+SIZE_TOLERANCE = 0.3  # Allowed relative change in face size between frames
+MERGE_IOU = 0.3  # Tracked boxes overlapping more than this are the same face
+
+
+def box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def suppress_overlaps(boxes: List[Tuple[int, int, int, int]],
+                      max_iou: float = MERGE_IOU) -> List[Tuple[int, int, int, int]]:
+    """Non-maximum suppression: keep the larger of any two boxes overlapping more than max_iou"""
+    kept: List[Tuple[int, int, int, int]] = []
+    for box in sorted(boxes, key=lambda b: b[2] * b[3], reverse=True):
+        if all(box_iou(box, other) <= max_iou for other in kept):
+            kept.append(box)
+    return kept
+
+
+class FaceTracker:
+    """
+    Runs the detector only inside an expanded box around each tracked face,
+    with a narrow min/max size range. A full-frame scan runs every
+    `full_scan_interval` frames, or immediately when every track is lost.
+    Tracks that converge on the same face are merged.
+    """
+
+    def __init__(self, detect: DetectFn, min_size: Tuple[int, int],
+                 full_scan_interval: int = FULL_SCAN_INTERVAL,
+                 roi_margin: float = ROI_MARGIN,
+                 size_tolerance: float = SIZE_TOLERANCE,
+                 merge_iou: float = MERGE_IOU):
+        self._detect = detect
+        self.min_size = min_size
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.roi_margin = roi_margin
+        self.size_tolerance = size_tolerance
+        self.merge_iou = merge_iou
+        self.tracks: List[Tuple[int, int, int, int]] = []
+        self._frames_since_full = 0
+        # Counters
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.track_losses = 0
+        self.track_merges = 0
+
+    def reset(self):
+        """Forget all tracks so the next frame gets a full scan"""
+        self.tracks = []
+        self._frames_since_full = 0
+
+    def _full_scan(self, gray: np.ndarray) -> np.ndarray:
+        self.full_scans += 1
+        self._frames_since_full = 0
+        faces = self._detect(gray, self.min_size, None)
+        self.tracks = [tuple(int(v) for v in box) for box in faces]
+        return np.asarray(faces).reshape(-1, 4)
+
+    def _track(self, gray: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """Search for one tracked face inside its ROI; return its new box or None"""
+        x, y, w, h = box
+        frame_h, frame_w = gray.shape[:2]
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        min_side = max(self.min_size[0], int(min(w, h) * (1 - self.size_tolerance)))
+        max_side = int(max(w, h) * (1 + self.size_tolerance))
+        if x1 - x0 < min_side or y1 - y0 < min_side:
+            return None
+
+        self.roi_scans += 1
+        faces = self._detect(gray[y0:y1, x0:x1], (min_side, min_side), (max_side, max_side))
+        if len(faces) == 0:
+            return None
+        # Keep the detection closest to where the face was
+        cx, cy = x + w / 2, y + h / 2
+        fx, fy, fw, fh = min(faces, key=lambda f: (x0 + f[0] + f[2] / 2 - cx) ** 2 +
+                                                  (y0 + f[1] + f[3] / 2 - cy) ** 2)
+        return int(x0 + fx), int(y0 + fy), int(fw), int(fh)
+
+    def detect(self, gray: np.ndarray) -> np.ndarray:
+        """Return face boxes (x, y, w, h) in frame coordinates"""
+        self._frames_since_full += 1
+        if not self.tracks or self._frames_since_full >= self.full_scan_interval:
+            return self._full_scan(gray)
+
+        tracked = [self._track(gray, box) for box in self.tracks]
+        kept = [box for box in tracked if box is not None]
+        self.track_losses += len(tracked) - len(kept)
+        if not kept:
+            # Lost everything: fall back to a full scan on this same frame
+            return self._full_scan(gray)
+        # Tracks that converged on the same face would be scored twice per frame
+        merged = suppress_overlaps(kept, self.merge_iou)
+        self.track_merges += len(kept) - len(merged)
+        kept = merged
+        self.tracks = kept
+        return np.array(kept, dtype=np.int32).reshape(-1, 4)
+
+    def stats(self) -> dict:
+        return {"full_scans": self.full_scans, "roi_scans": self.roi_scans,
+                "track_losses": self.track_losses, "track_merges": self.track_merges}
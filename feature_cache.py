@@ -0,0 +1,93 @@
+"""
+Feature Cache - Per-image enrollment features keyed by file content and extraction parameters
+"""
+
+import hashlib
+import io
+import logging
+import os
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+_HASH_CHUNK = 1 << 20
+
+
+class FeatureCache:
+    """
+    Maps sha256(extraction parameters + image bytes) to the image's face
+    features, or to None when no face was found. Changing either the image or
+    the parameters (the `fingerprint`) yields a new key, so stale entries are
+    never reused.
+    """
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self._entries: Dict[str, Optional[np.ndarray]] = {}
+
+    def key_for(self, img_path: str) -> str:
+        """Hash an image file's content together with the extraction parameters"""
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+        with open(img_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self._entries.get(key)
+
+    def put(self, key: str, features: Optional[np.ndarray]) -> None:
+        self._entries[key] = None if features is None else np.asarray(features, dtype=np.float32)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str,
+             unprotect: Optional[Callable[[bytes], bytes]] = None) -> "FeatureCache":
+        """Load a cache file; a missing or unreadable file gives an empty cache"""
+        cache = cls(fingerprint)
+        if not os.path.exists(path):
+            return cache
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if unprotect is not None:
+                data = unprotect(data)
+            with np.load(io.BytesIO(data), allow_pickle=False) as stored:
+                for key, has_face, features in zip(stored["keys"], stored["has_face"],
+                                                   stored["features"]):
+                    cache._entries[str(key)] = features.copy() if has_face else None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable enrollment cache {path}: {e}")
+            cache._entries.clear()
+        return cache
+
+    def save(self, path: str, keep: Optional[Iterable[str]] = None,
+             protect: Optional[Callable[[bytes], bytes]] = None) -> None:
+        """Write the cache, dropping entries not in `keep` (e.g. deleted images)"""
+        if keep is not None:
+            keep = set(keep)
+            self._entries = {k: v for k, v in self._entries.items() if k in keep}
+        keys = list(self._entries)
+        dim = next((v.shape[0] for v in self._entries.values() if v is not None), 0)
+        features = np.zeros((len(keys), dim), dtype=np.float32)
+        has_face = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            value = self._entries[key]
+            if value is not None and value.shape[0] == dim:
+                features[i] = value
+                has_face[i] = True
+
+        buffer = io.BytesIO()
+        np.savez(buffer, keys=np.array(keys, dtype="<U64"), has_face=has_face, features=features)
+        data = buffer.getvalue()
+        if protect is not None:
+            data = protect(data)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
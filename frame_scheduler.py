@@ -0,0 +1,96 @@
+"""
+Frame Scheduler - Adaptive frame skipping driven by a CPU budget
+"""
+
+import math
+from typing import Optional
+
+CPU_BUDGET = 0.6  # Fraction of wall time the recognition loop may spend processing
+MAX_SKIP = 8
+SMOOTHING = 0.25  # EWMA weight of the newest processing-time sample
+RELAX_AFTER = 5  # Consecutive samples with headroom before processing more frames
+
+
+class AdaptiveFrameScheduler:
+    """
+    Decides which camera frames get processed so processing keeps up with the
+    camera within a CPU budget.
+
+    Processing one frame in every `skip` frames costs processing_time per
+    skip * frame_interval of wall time, so the smallest skip that fits the
+    budget is ceil(processing_time / (frame_interval * cpu_budget)). Slower
+    processing (a contended CPU or a slow machine) raises the skip at once;
+    headroom lowers it one step at a time, down to processing every frame.
+    """
+
+    def __init__(self, frame_interval: float, cpu_budget: float = CPU_BUDGET,
+                 initial_skip: int = 1, min_skip: int = 1, max_skip: int = MAX_SKIP,
+                 smoothing: float = SMOOTHING, relax_after: int = RELAX_AFTER):
+        self.frame_interval = frame_interval
+        self.cpu_budget = cpu_budget
+        self.min_skip = max(1, min_skip)
+        self.max_skip = max(self.min_skip, max_skip)
+        self.skip = min(max(initial_skip, self.min_skip), self.max_skip)
+        self.smoothing = smoothing
+        self.relax_after = relax_after
+        self.processing_time: Optional[float] = None
+        self._since_processed = 0
+        self._headroom_samples = 0
+        # Counters
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.skip_changes = 0
+
+    def should_process(self) -> bool:
+        """Call once per camera frame; True if this frame should be processed"""
+        self.frames_seen += 1
+        self._since_processed += 1
+        if self._since_processed >= self.skip:
+            self._since_processed = 0
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def required_skip(self) -> int:
+        """Smallest skip that keeps processing within the CPU budget"""
+        if self.processing_time is None:
+            return self.skip
+        budget = self.frame_interval * self.cpu_budget
+        needed = math.ceil(self.processing_time / budget) if budget > 0 else self.max_skip
+        return min(max(needed, self.min_skip), self.max_skip)
+
+    def record(self, seconds: float) -> None:
+        """Feed the time spent processing the last frame"""
+        if self.processing_time is None:
+            self.processing_time = seconds
+        else:
+            self.processing_time += self.smoothing * (seconds - self.processing_time)
+
+        needed = self.required_skip()
+        if needed > self.skip:
+            # Falling behind: back off immediately
+            self._set_skip(needed)
+            self._headroom_samples = 0
+        elif needed < self.skip:
+            self._headroom_samples += 1
+            if self._headroom_samples >= self.relax_after:
+                self._set_skip(self.skip - 1)
+                self._headroom_samples = 0
+        else:
+            self._headroom_samples = 0
+
+    def _set_skip(self, skip: int) -> None:
+        if skip != self.skip:
+            self.skip = skip
+            self.skip_changes += 1
+
+    @property
+    def processing_rate(self) -> float:
+        """Fraction of camera frames currently processed"""
+        return 1.0 / self.skip
+
+    def stats(self) -> dict:
+        return {"skip": self.skip, "frames_seen": self.frames_seen,
+                "frames_skipped": self.frames_skipped, "skip_changes": self.skip_changes,
+                "processing_ms": None if self.processing_time is None else self.processing_time * 1000.0}
+
@@ -0,0 +1,246 @@
+"""
+Frame Sources - File-backed and synthetic stand-ins for CameraManager
+
+Each source has the same surface as CameraManager (initialize, read_frame,
+grab_frame, release, context manager), so recognition can be replayed
+headless on a machine without a camera.
+"""
+
+import os
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+
+class FrameSource:
+    """Base class: subclasses implement _open() and _next_frame()"""
+
+    background = False
+
+    def __init__(self, fps: Optional[float] = None, loop: bool = False,
+                 size: Optional[Tuple[int, int]] = None):
+        self.fps = fps  # Pace reads like a camera; None = as fast as possible
+        self.loop = loop
+        self.size = size  # Resize frames to (width, height)
+        self.is_initialized = False
+        self.exhausted = False
+        self.frames_read = 0
+        self._next_due = 0.0
+
+    def _open(self) -> bool:
+        raise NotImplementedError
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self) -> None:
+        raise NotImplementedError
+
+    def initialize(self) -> bool:
+        self.exhausted = False
+        self.frames_read = 0
+        self._next_due = time.perf_counter()
+        self.is_initialized = self._open()
+        return self.is_initialized
+
+    def _pace(self) -> None:
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_due > now:
+                time.sleep(self._next_due - now)
+            self._next_due = max(self._next_due, now) + 1.0 / self.fps
+
+    def read_frame(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.is_initialized or self.exhausted:
+            return False, None
+        self._pace()
+        frame = self._next_frame()
+        if frame is None and self.loop:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            self.exhausted = True
+            return False, None
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+        self.frames_read += 1
+        return True, frame
+
+    def grab_frame(self) -> bool:
+        ret, _ = self.read_frame()
+        return ret
+
+    def release(self):
+        self.is_initialized = False
+
+    def __enter__(self):
+        self.initialize()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class VideoFileSource(FrameSource):
+    """Frames from a video file or an OpenCV image-sequence pattern (e.g. img_%04d.png)"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.cap = None
+
+    def _open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.path)
+        return self.cap.isOpened()
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _rewind(self) -> None:
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab_frame(self) -> bool:
+        # Skip without decoding, like CameraManager
+        if not self.is_initialized or self.exhausted:
+            return False
+        self._pace()
+        if self.cap.grab():
+            return True
+        if self.loop:
+            self._rewind()
+            return self.cap.grab()
+        self.exhausted = True
+        return False
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        super().release()
+
+
+class ImageFolderSource(FrameSource):
+    """Frames from the images in a folder, in file name order"""
+
+    def __init__(self, folder: str, **kwargs):
+        super().__init__(**kwargs)
+        self.folder = folder
+        self.paths: List[str] = []
+        self._pos = 0
+
+    def _open(self) -> bool:
+        if not os.path.isdir(self.folder):
+            return False
+        self.paths = [os.path.join(self.folder, f) for f in sorted(os.listdir(self.folder))
+                      if f.lower().endswith(IMAGE_EXTENSIONS)]
+        self._pos = 0
+        return bool(self.paths)
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        while self._pos < len(self.paths):
+            frame = cv2.imread(self.paths[self._pos])
+            self._pos += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self) -> None:
+        self._pos = 0
+
+
+def vary_face(face: np.ndarray, rng: np.random.Generator, amount: float = 1.0) -> np.ndarray:
+    """
+    Randomly change a face image's pose, exposure, lighting direction, focus
+    and resolution, so it scores like another capture of the same person
+    instead of an exact copy. `amount` scales every change (0 = unchanged).
+    """
+    if amount <= 0:
+        return face
+    height, width = face.shape[:2]
+    centre = (width / 2 + rng.normal(0, 0.03 * amount * width),
+              height / 2 + rng.normal(0, 0.03 * amount * height))
+    warp = cv2.getRotationMatrix2D(centre, rng.normal(0, 6 * amount), 1 + rng.normal(0, 0.05 * amount))
+    out = cv2.warpAffine(face, warp, (width, height), borderMode=cv2.BORDER_REFLECT)
+    gamma = np.exp(rng.normal(0, 0.25 * amount))
+    out = (255.0 * (out / 255.0) ** gamma).astype(np.float32)
+    blur = abs(rng.normal(0, 1.2 * amount))
+    if blur > 0.3:
+        out = cv2.GaussianBlur(out, (0, 0), blur)
+    shrink = 1.0 / (1.0 + amount * rng.random())
+    small = (max(8, int(width * shrink)), max(8, int(height * shrink)))
+    out = cv2.resize(cv2.resize(out, small, interpolation=cv2.INTER_AREA), (width, height))
+    # Light from one side
+    out += (np.linspace(-1.0, 1.0, width, dtype=np.float32) * rng.normal(0, 40 * amount)).reshape(
+        (1, width) + (1,) * (out.ndim - 2))
+    out += rng.normal(0, 6 * amount, out.shape).astype(np.float32)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Noisy background frames with an optional face image planted in them.
+    The face drifts slowly and changes brightness a little between frames,
+    like a person sitting in front of the camera. With `variation` each
+    frame also shows a differently captured face (see vary_face).
+    """
+
+    def __init__(self, face_img: Optional[np.ndarray] = None,
+                 size: Tuple[int, int] = (640, 480), frames: int = 300,
+                 face_scale: float = 0.45, seed: int = 0, variation: float = 0.0, **kwargs):
+        super().__init__(size=None, **kwargs)
+        self.frame_size = size
+        self.total_frames = frames
+        self.face_img = face_img
+        self.face_scale = face_scale
+        self.seed = seed
+        self.variation = variation
+        self._index = 0
+        self._rng = None
+        self._background = None
+        self._face = None
+        self.last_face_box = None  # (x, y, w, h) of the face in the last frame, for ground truth
+
+    def _open(self) -> bool:
+        width, height = self.frame_size
+        self._rng = np.random.default_rng(self.seed)
+        self._background = self._rng.integers(20, 90, (height, width, 3), dtype=np.uint8)
+        self._background = cv2.GaussianBlur(self._background, (0, 0), 5)
+        if self.face_img is not None:
+            side = int(min(width, height) * self.face_scale)
+            self._face = cv2.resize(self.face_img, (side, side), interpolation=cv2.INTER_AREA)
+        self._index = 0
+        return True
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        if self.total_frames and self._index >= self.total_frames:
+            return None
+        frame = self._background.copy()
+        if self._face is not None:
+            height, width = frame.shape[:2]
+            side = self._face.shape[0]
+            # Slow drift around the centre of the frame
+            t = self._index / 15.0
+            x = int((width - side) / 2 + np.sin(t) * (width - side) / 6)
+            y = int((height - side) / 2 + np.cos(t * 0.7) * (height - side) / 8)
+            gain = 1.0 + 0.05 * np.sin(t * 1.3)
+            face = vary_face(self._face, self._rng, self.variation)
+            frame[y:y + side, x:x + side] = cv2.convertScaleAbs(face, alpha=gain)
+            self.last_face_box = (x, y, side, side)
+        noise = self._rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        self._index += 1
+        return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    def _rewind(self) -> None:
+        self._index = 0
+
+
+def open_source(spec: str, **kwargs) -> FrameSource:
+    """Pick a source for a path: a folder of images, or a video / image-sequence pattern"""
+    if os.path.isdir(spec):
+        return ImageFolderSource(spec, **kwargs)
+    return VideoFileSource(spec, **kwargs)
@@ -0,0 +1,151 @@
+"""
+Metrics - Low-overhead counters and latency histograms for the recognition hot path
+
+Disabled by default: instrumented code checks `registry.enabled` before
+reading the clock, so the cost when off is one attribute lookup. Snapshots
+export as JSON or as Prometheus text exposition format.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+# Latency buckets in seconds (0.1 ms .. 10 s, roughly 2.5x apart)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets for small per-frame counts (faces, comparisons)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 100, 1000, 10000, 100000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative export, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile: upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, n = self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {"buckets": list(self.buckets), "cumulative_counts": cumulative,
+                "sum": total, "count": n,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms; every method is a no-op while disabled"""
+
+    def __init__(self, prefix: str = "face_unlock", enabled: bool = False):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Record the current value of a quantity that can go up and down"""
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(buckets))
+        histogram.observe(value)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Record a hot-path stage duration as `stage_seconds{stage=...}`"""
+        self.observe(f"stage_seconds:{stage}", seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict:
+        return {"timestamp": time.time(),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {name: h.snapshot() for name, h in list(self.histograms.items())}}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(self.gauges.items()):
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        typed = set()
+        for key, histogram in sorted(self.histograms.items()):
+            name, _, label = key.partition(":")
+            metric = f"{self.prefix}_{name}"
+            labels = f'stage="{label}",' if label else ""
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            snap = histogram.snapshot()
+            for bound, count in zip(snap["buckets"] + ["+Inf"], snap["cumulative_counts"]):
+                lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {count}')
+            label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{metric}_sum{label_set} {snap['sum']}")
+            lines.append(f"{metric}_count{label_set} {snap['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Atomically write a snapshot: Prometheus text for .prom files, JSON otherwise"""
+        data = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry used by the recognition pipeline
+registry = MetricsRegistry()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Multi Source - Authenticate across several cameras at once
+
+Each source (a camera index, or a video file / image folder standing in for
+one) runs its own liveness sequence on a worker thread against one shared
+gallery and matcher. OpenCV releases the GIL while detecting, so the
+sources are processed in parallel. The first source to recognize a user
+wins and the others are cancelled at their next frame.
+
+    python multi_source.py 0 1
+    python multi_source.py door.mp4 desk.mp4
+"""
+
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import user_face_unlock as app
+from face_gallery import TemplateGallery
+from frame_sources import open_source
+from user_face_unlock import RecognitionProgress, RecognitionResult
+
+
+def make_camera(spec: Union[int, str]):
+    """A CameraManager for a camera index, or a camera-paced file-backed source"""
+    if isinstance(spec, int) or spec.isdigit():
+        return app.CameraManager(int(spec), background=app.CAMERA_BACKGROUND_CAPTURE)
+    return open_source(spec, fps=app.CAMERA_FPS)
+
+
+def authenticate_any(cameras: Sequence,
+                     window_sec: float = app.LIVENESS_WINDOW_SEC,
+                     matches_required: Optional[int] = None,
+                     gallery: Optional[TemplateGallery] = None,
+                     matcher=None,
+                     progress: Optional[Callable[[int, RecognitionProgress], None]] = None
+                     ) -> Tuple[Optional[int], RecognitionResult]:
+    """
+    Run one liveness sequence per camera in parallel. Returns the index of
+    the source that recognized a user (None if none did) and its result.
+    A rejection only ends that source's attempt, so a stranger in front of
+    one camera cannot stop another camera from unlocking. `progress` is
+    called from the worker threads with (source index, event).
+    """
+    if gallery is None:
+        gallery, matcher = app.get_cached_gallery()
+    if not gallery:
+        logging.error("No templates available for recognition")
+        return None, RecognitionResult(False)
+    if matcher is None:
+        matcher = app.make_matcher(gallery)
+
+    stop = threading.Event()
+    winner, outcome = None, RecognitionResult(False)
+    with ThreadPoolExecutor(max_workers=len(cameras), thread_name_prefix="source") as pool:
+        futures = {}
+        for i, camera in enumerate(cameras):
+            on_progress = (lambda event, i=i: progress(i, event)) if progress is not None else None
+            futures[pool.submit(app.is_live_sequence, matches_required, window_sec,
+                                camera=camera, gallery=gallery, matcher=matcher,
+                                cancel=stop, progress=on_progress)] = i
+
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"Source {i} failed: {e}")
+                continue
+            if winner is not None:
+                continue
+            if result:
+                winner, outcome = i, result
+                stop.set()
+                logging.info(f"Source {i} recognized {result.user_id}; cancelling the other sources")
+            elif result.matches > outcome.matches:
+                outcome = result
+    return winner, outcome
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ["-h", "--help", "help"]:
+        print("Multi Source - Usage:")
+        print(f"  python {sys.argv[0]} <camera index | video file | image folder> ...")
+        return
+
+    specs = sys.argv[1:]
+    winner, result = authenticate_any([make_camera(spec) for spec in specs])
+    if result:
+        print(f"✓ Recognized {result.user_id} on {specs[winner]} "
+              f"(similarity {result.similarity:.3f})")
+    else:
+        print("❌ No source recognized an enrolled user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Result Reuse - Skip detection and matching for frames where the face did not move
+
+The face boxes of the last fully scored frame are kept with a small
+thumbnail of each face. When the same regions of a new frame still look
+the same (mean absolute gray-level change below a threshold), detection,
+extraction and matching are skipped and the previous results are reused.
+A bound on consecutive reuses forces a fresh scoring regularly. Reused
+results are not new evidence: callers check `last_hit` and must not count
+them towards liveness matches or a sequential decision.
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+MAX_DIFFERENCE = 3.0  # Mean absolute gray-level change of a face thumbnail that counts as unchanged
+MAX_REUSES = 2  # Consecutive frames a result may be reused for before rescoring
+SIGNATURE_SIZE = (16, 16)
+
+
+class ResultReuse:
+    """Cross-frame cache of the last scored faces and their match results"""
+
+    def __init__(self, max_difference: float = MAX_DIFFERENCE, max_reuses: int = MAX_REUSES):
+        self.max_difference = max_difference
+        self.max_reuses = max_reuses
+        self._faces = None
+        self._signatures = None
+        self._result = None
+        self._reuses = 0
+        self.last_hit = False  # Whether the last lookup returned reused results
+        # Counters
+        self.frames_reused = 0
+        self.frames_scored = 0
+        self.motion_misses = 0
+
+    @staticmethod
+    def _signature(gray: np.ndarray, box) -> np.ndarray:
+        x, y, w, h = box
+        return cv2.resize(gray[y:y + h, x:x + w], SIGNATURE_SIZE,
+                          interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def lookup(self, gray: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return the previous (best_idx, best_scores) if the faces look unchanged, else None"""
+        self.last_hit = False
+        if self._result is None or self._reuses >= self.max_reuses:
+            return None
+        for box, signature in zip(self._faces, self._signatures):
+            if np.abs(self._signature(gray, box) - signature).mean() >= self.max_difference:
+                self.motion_misses += 1
+                return None
+        self._reuses += 1
+        self.frames_reused += 1
+        self.last_hit = True
+        return self._result
+
+    def store(self, gray: np.ndarray, faces, best_idx: np.ndarray, best_scores: np.ndarray) -> None:
+        """Remember a freshly scored frame; frames without faces clear the cache"""
+        self.frames_scored += 1
+        self._reuses = 0
+        if len(faces) == 0:
+            self._result = None
+            return
+        self._faces = [tuple(int(v) for v in box) for box in faces]
+        self._signatures = [self._signature(gray, box) for box in self._faces]
+        self._result = (best_idx.copy(), best_scores.copy())
+
+    def stats(self) -> dict:
+        return {"frames_reused": self.frames_reused, "frames_scored": self.frames_scored,
+                "motion_misses": self.motion_misses}
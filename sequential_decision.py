@@ -0,0 +1,90 @@
+"""
+Sequential Decision - Early accept/reject from accumulated per-frame similarity evidence
+"""
+
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+ACCEPT = "accept"
+REJECT = "reject"
+CONTINUE = "continue"
+
+
+class SequentialDecision:
+    """
+    Wald's sequential probability ratio test over per-frame similarity scores.
+
+    Each face's best score is treated as a Gaussian sample, centred on
+    `genuine_mean` when the face belongs to the matched user and on
+    `impostor_mean` otherwise. The log-likelihood ratio is summed per user
+    and compared with thresholds derived from the target error rates:
+    accept when it reaches log((1 - false_reject) / false_accept), reject
+    when every observed user has fallen to log(false_reject / (1 - false_accept)).
+    Strong matches therefore decide in fewer frames than a fixed match count,
+    and clear non-matches stop long before the window runs out.
+
+    No single frame may carry more than 1/min_frames of the accept (or
+    reject) threshold, and only frames scoring at least `min_score` add
+    positive evidence, so accepting takes at least `min_frames` frames that
+    each match on their own.
+    """
+
+    def __init__(self, genuine_mean: float, impostor_mean: float, score_std: float,
+                 false_accept: float, false_reject: float, min_frames: int = 1,
+                 min_score: Optional[float] = None):
+        if not genuine_mean > impostor_mean:
+            raise ValueError("genuine_mean must be above impostor_mean")
+        if not (0 < false_accept < 1 and 0 < false_reject < 1):
+            raise ValueError("Error targets must be between 0 and 1")
+        self.genuine_mean = genuine_mean
+        self.impostor_mean = impostor_mean
+        self.variance = score_std ** 2
+        self.accept_threshold = math.log((1 - false_reject) / false_accept)
+        self.reject_threshold = math.log(false_reject / (1 - false_accept))
+        self.min_frames = max(1, min_frames)
+        self.min_score = min_score
+        self.max_frame_evidence = self.accept_threshold / self.min_frames
+        self.min_frame_evidence = self.reject_threshold / self.min_frames
+        self.llr: Dict[str, float] = {}
+        self.matches: Dict[str, int] = {}  # Frames per user scoring at least min_score
+        self.frames = 0  # Processed frames that contributed evidence
+        self.decision = CONTINUE
+        self.user_id: Optional[str] = None
+
+    def log_likelihood_ratio(self, score: float) -> float:
+        """Evidence one score gives for 'genuine' over 'impostor'"""
+        return ((score - self.impostor_mean) ** 2
+                - (score - self.genuine_mean) ** 2) / (2 * self.variance)
+
+    def frame_evidence(self, score: float) -> float:
+        """Clipped log-likelihood ratio one frame adds to a user's total"""
+        llr = self.log_likelihood_ratio(score)
+        if self.min_score is not None and score < self.min_score:
+            llr = min(llr, 0.0)
+        return min(max(llr, self.min_frame_evidence), self.max_frame_evidence)
+
+    def update(self, observations: Iterable[Tuple[str, float]]) -> str:
+        """Add one frame's (user_id, best score) pairs and return the current decision"""
+        if self.decision != CONTINUE:
+            return self.decision
+        frame_scores: Dict[str, float] = {}
+        for user_id, score in observations:
+            frame_scores[user_id] = max(frame_scores.get(user_id, score), score)
+        if not frame_scores:
+            return self.decision
+
+        self.frames += 1
+        for user_id, score in frame_scores.items():
+            self.llr[user_id] = self.llr.get(user_id, 0.0) + self.frame_evidence(score)
+            if self.min_score is None or score >= self.min_score:
+                self.matches[user_id] = self.matches.get(user_id, 0) + 1
+
+        if self.frames >= self.min_frames:
+            leader, evidence = max(self.llr.items(), key=lambda item: item[1])
+            # Tolerance: min_frames clipped frames sum to the threshold up to rounding
+            if evidence >= self.accept_threshold - 1e-9 \
+                    and self.matches.get(leader, 0) >= self.min_frames:
+                self.decision, self.user_id = ACCEPT, leader
+            elif evidence <= self.reject_threshold:
+                self.decision = REJECT
+        return self.decision
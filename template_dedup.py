@@ -0,0 +1,145 @@
+"""
+Template Dedup - Enrollment-time clustering of near-duplicate templates
+
+Burst shots and video frames enroll many templates that are almost the
+same image. Each user's templates are grouped into clusters of templates
+at least DEDUP_SIMILARITY alike; each cluster is replaced by its medoid (a
+real capture, unlike a pixel-average centroid, which blurs), and when a
+user still has more than MAX_TEMPLATES_PER_USER clusters the most
+mutually dissimilar medoids are kept so pose coverage is preserved.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from face_gallery import TemplateGallery
+from face_matcher import normalize_rows
+
+DEDUP_SIMILARITY = 0.95  # Templates at least this alike are merged
+MAX_TEMPLATES_PER_USER = 30
+_PROBE_CHUNK_ROWS = 1024
+
+
+@dataclass
+class DedupReport:
+    """Gallery size before and after dedup, and how many original captures still match"""
+    templates_before: int
+    templates_after: int
+    per_user: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # user -> (before, after)
+    # Fraction of the original templates whose best match in the deduplicated
+    # gallery is their own user at or above the tolerance
+    match_rate: float = 1.0
+    worst_similarity: float = 1.0  # Lowest best-match score of a removed template
+
+    def summary(self) -> str:
+        return (f"{self.templates_before} -> {self.templates_after} templates, "
+                f"{self.match_rate:.1%} of the originals still match "
+                f"(worst removed template scores {self.worst_similarity:.3f})")
+
+
+def _neighbour_lists(normalized: np.ndarray, similarity: float) -> List[np.ndarray]:
+    """Rows at least `similarity` alike to each row (itself included), scored one block at a time"""
+    neighbours = []
+    for start in range(0, normalized.shape[0], _PROBE_CHUNK_ROWS):
+        close = normalized[start:start + _PROBE_CHUNK_ROWS] @ normalized.T >= similarity
+        neighbours.extend(np.flatnonzero(row).astype(np.int32) for row in close)
+    return neighbours
+
+
+def select_templates(templates: np.ndarray, similarity: float = DEDUP_SIMILARITY,
+                     max_templates: int = MAX_TEMPLATES_PER_USER) -> np.ndarray:
+    """Return the (sorted) rows of one user's templates to keep"""
+    count = templates.shape[0]
+    if count <= 1:
+        return np.arange(count)
+    normalized = normalize_rows(templates)
+    # Only the neighbour lists are kept, never the full count x count matrix
+    neighbours = _neighbour_lists(normalized, similarity)
+
+    # Leader clustering: the template with the most unclaimed neighbours seeds
+    # the next cluster, which takes all of them. Counts only ever drop, so a
+    # lazily refreshed max-heap finds the seed without rescanning every row.
+    unclaimed = np.ones(count, dtype=bool)
+    heap = [(-len(rows), i) for i, rows in enumerate(neighbours)]
+    heapq.heapify(heap)
+    medoids = []
+    while heap:
+        _, seed = heapq.heappop(heap)
+        if not unclaimed[seed]:
+            continue
+        members = neighbours[seed][unclaimed[neighbours[seed]]]
+        if heap and -len(members) > heap[0][0]:
+            # Fewer unclaimed neighbours than recorded, and no longer the leader
+            heapq.heappush(heap, (-len(members), seed))
+            continue
+        if len(members) == 0:
+            # A zero template is not even similar to itself
+            members = np.array([seed])
+        unclaimed[members] = False
+        # Medoid: the member most similar to the rest of its cluster; with unit
+        # rows, each row sum of the cluster's similarities is one dot product
+        cluster = normalized[members]
+        medoids.append(int(members[np.argmax(cluster @ cluster.sum(axis=0))]))
+
+    medoids = np.array(medoids)
+    if len(medoids) > max_templates:
+        # Farthest-point selection, starting from the first (densest) cluster
+        vectors = normalized[medoids]
+        chosen = [0]
+        nearest = vectors @ vectors[0]
+        while len(chosen) < max_templates:
+            nearest[chosen] = np.inf
+            pick = int(np.argmin(nearest))
+            chosen.append(pick)
+            nearest = np.maximum(nearest, vectors @ vectors[pick])
+        medoids = medoids[chosen]
+    return np.sort(medoids)
+
+
+def match_coverage(gallery: TemplateGallery, keep: np.ndarray,
+                   tolerance: float) -> Tuple[float, float]:
+    """
+    Score every template of the gallery against the kept rows. Returns the
+    fraction whose best match is their own user at or above `tolerance`,
+    and the lowest best-match score among the removed templates.
+    """
+    if len(gallery) == 0:
+        return 1.0, 1.0
+    if len(keep) == 0:
+        return 0.0, 0.0
+    normalized = normalize_rows(gallery.templates)
+    kept = normalized[keep]
+    removed = np.ones(len(gallery), dtype=bool)
+    removed[keep] = False
+    matched, worst = 0, 1.0
+    for start in range(0, len(gallery), _PROBE_CHUNK_ROWS):
+        probes = np.arange(start, min(start + _PROBE_CHUNK_ROWS, len(gallery)))
+        scores = normalized[probes] @ kept.T
+        best = np.argmax(scores, axis=1)
+        best_scores = np.minimum(scores[np.arange(len(probes)), best], 1.0)
+        matched += int(np.sum((best_scores >= tolerance) &
+                              (gallery.labels[keep[best]] == gallery.labels[probes])))
+        if removed[probes].any():
+            worst = min(worst, float(best_scores[removed[probes]].min()))
+    return matched / len(gallery), worst
+
+
+def dedup_gallery(gallery: TemplateGallery, similarity: float = DEDUP_SIMILARITY,
+                  max_templates: int = MAX_TEMPLATES_PER_USER,
+                  tolerance: float = 0.7) -> Tuple[TemplateGallery, DedupReport]:
+    """Deduplicate every user's templates; returns the smaller gallery and a report"""
+    keep, per_user = [], {}
+    for label, user_id in enumerate(gallery.user_ids):
+        rows = np.flatnonzero(gallery.labels == label)
+        kept = rows[select_templates(gallery.templates[rows], similarity, max_templates)]
+        keep.append(kept)
+        per_user[user_id] = (len(rows), len(kept))
+    keep = np.sort(np.concatenate(keep)) if keep else np.zeros(0, dtype=np.int64)
+
+    deduped = TemplateGallery(gallery.user_ids, gallery.templates[keep], gallery.labels[keep])
+    match_rate, worst = match_coverage(gallery, keep, tolerance)
+    report = DedupReport(len(gallery), len(deduped), per_user, match_rate, worst)
+    return deduped, report
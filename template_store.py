@@ -0,0 +1,620 @@
+"""
+Template Store - Versioned binary template file that can be memory-mapped zero-copy
+
+File layout (little-endian):
+
+    header   32 bytes  magic, version, flags, count, dim, users length,
+                       compact dim, data offset
+    length   8 bytes   stored data length (version 3)
+    users    JSON list of user IDs (UTF-8)
+    labels   int32[count], index into users for each template row
+    padding  up to a 64-byte boundary
+    data     float32[count, dim] template matrix
+    compact  only with FLAG_COMPACT, from the next 64-byte boundary:
+             float32[compact dim, dim] projection, float32[count] scales,
+             int8[count, compact dim] codes
+    journal  records appended after the data (version 3), see below
+
+With FLAG_PROTECTED, everything from `data` up to the journal is one DPAPI blob.
+
+The journal lets enrollment add or retire templates without rewriting the
+file. Every record is a 13-byte header (magic, kind, payload length,
+CRC-32 of the payload) and a payload, which is a DPAPI blob when the kind
+has RECORD_PROTECTED set:
+
+    ADD      uint32 JSON length, {"user", "adapted", "dim"}, float32[n, dim]
+    RETIRE   int64 IDs of templates to drop
+    ADAPTED  int64 IDs of matrix rows that came from online adaptation
+    IDS      int64 next ID, int64[count] template ID of each matrix row
+
+write_gallery starts the journal with an IDS record, so template IDs
+survive rewrites and are never reused; files without one number their
+matrix rows 0..count-1. Added templates take the next IDs in journal
+order. Loading replays the journal; a torn record at the end (from a
+crash mid-append) is ignored and overwritten by the next append.
+Rewriting the file with write_gallery folds the journal back in.
+
+Writers in any process serialize on an OS lock of a `<file>.lock` file
+beside the store (see store_lock), so an append never mistakes another
+process's append in progress for a torn record, and a rewrite never
+drops a record appended while it was reading.
+"""
+
+import io
+import json
+import os
+import pickle
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from compact_templates import CompactCodec, CompactTemplates
+from face_gallery import TemplateGallery
+
+MAGIC = b"FTPL"
+FORMAT_VERSION = 3
+_SUPPORTED_VERSIONS = (1, 2, 3)  # 2 added the compact section, 3 the data length and journal
+FLAG_PROTECTED = 0x1  # Template matrix is encrypted and must be decoded into memory
+FLAG_COMPACT = 0x2  # A compact (projected, int8) copy of the templates follows the matrix
+
+RECORD_MAGIC = b"JRNL"
+RECORD_ADD = 1
+RECORD_RETIRE = 2
+RECORD_ADAPTED = 3
+RECORD_IDS = 4
+RECORD_PROTECTED = 0x80  # Payload is a DPAPI blob
+
+_HEADER = struct.Struct("<4sHHIIIIQ")
+_DATA_LENGTH = struct.Struct("<Q")
+_RECORD = struct.Struct("<4sBII")
+_DATA_ALIGNMENT = 64
+
+# In-memory journal record: (kind, user ID, templates, adapted) for RECORD_ADD,
+# (kind, template IDs) for RECORD_RETIRE and RECORD_ADAPTED
+Record = Tuple[Any, ...]
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _DATA_ALIGNMENT) * _DATA_ALIGNMENT
+
+
+def _compact_offsets(count: int, dim: int, compact_dim: int) -> Tuple[int, int, int, int]:
+    """Offsets of the projection, scales and codes relative to the data section, and its end"""
+    components = _align(4 * count * dim)
+    scales = components + 4 * compact_dim * dim
+    codes = scales + 4 * count
+    return components, scales, codes, codes + count * compact_dim
+
+
+class TemplateStoreError(Exception):
+    """Raised when a template file is malformed or uses an unsupported version"""
+
+
+def _lock_file(path: str):
+    """Open `path` and block until this process holds an exclusive OS lock on it"""
+    f = open(path, "a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after about 10 seconds; keep waiting
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def _unlock_file(f) -> None:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+
+class StoreLock:
+    """
+    Exclusive lock on one template file across threads and processes. It
+    is re-entrant within a thread, so a save inside an update does not
+    deadlock. The lock file is left in place: deleting it would race with
+    a process about to lock it.
+    """
+
+    def __init__(self, path: str):
+        self.lock_path = path + ".lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self) -> "StoreLock":
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                self._file = _lock_file(self.lock_path)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                _unlock_file(self._file)
+                self._file = None
+        finally:
+            self._thread_lock.release()
+
+
+_store_locks: Dict[str, StoreLock] = {}
+_store_locks_guard = threading.Lock()
+
+
+def store_lock(path: str) -> StoreLock:
+    """The process-wide StoreLock of a template file"""
+    key = os.path.abspath(path)
+    with _store_locks_guard:
+        lock = _store_locks.get(key)
+        if lock is None:
+            lock = _store_locks[key] = StoreLock(key)
+        return lock
+
+
+@dataclass
+class JournalState:
+    """Template IDs and journal bookkeeping of a loaded gallery"""
+    template_ids: np.ndarray  # Stable ID of each gallery row
+    adapted: np.ndarray  # Rows folded in from live captures by online adaptation
+    next_id: int
+    changes: int = 0  # ADD and RETIRE records replayed
+    journal_bytes: int = 0
+    data_bytes: int = 0
+
+    @classmethod
+    def fresh(cls, count: int) -> "JournalState":
+        return cls(np.arange(count, dtype=np.int64), np.zeros(count, dtype=bool), count)
+
+
+def journal_state(gallery: TemplateGallery) -> JournalState:
+    """The gallery's journal state; galleries not loaded from a store get IDs 0..n-1"""
+    return gallery.journal if gallery.journal is not None else JournalState.fresh(len(gallery))
+
+
+def add_record(user_id: str, templates: Sequence[np.ndarray], adapted: bool = False) -> Record:
+    """Journal record adding templates for a user"""
+    rows = np.stack([np.asarray(t, dtype=np.float32).ravel() for t in templates])
+    return RECORD_ADD, str(user_id), rows, adapted
+
+
+def retire_record(template_ids: Sequence[int]) -> Record:
+    """Journal record dropping templates by ID"""
+    return RECORD_RETIRE, np.asarray(template_ids, dtype=np.int64)
+
+
+def is_binary_store(path: str) -> bool:
+    """Return True if the file uses the binary store format (as opposed to a legacy pickle)"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _encode_record(record: Record, protect: Optional[Callable[[bytes], bytes]]) -> bytes:
+    kind = record[0]
+    if kind == RECORD_ADD:
+        _, user_id, templates, adapted = record
+        meta = json.dumps({"user": user_id, "adapted": bool(adapted),
+                           "dim": templates.shape[1]}).encode("utf-8")
+        payload = struct.pack("<I", len(meta)) + meta + templates.astype("<f4", copy=False).tobytes()
+    elif kind == RECORD_IDS:
+        _, template_ids, next_id = record
+        payload = np.concatenate([[next_id], template_ids]).astype("<i8").tobytes()
+    else:
+        payload = np.asarray(record[1], dtype="<i8").tobytes()
+    if protect is not None:
+        payload = protect(payload)
+        kind |= RECORD_PROTECTED
+    return _RECORD.pack(RECORD_MAGIC, kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode_record(kind: int, payload: bytes, dim: int,
+                   unprotect: Optional[Callable[[bytes], bytes]]) -> Record:
+    if kind & RECORD_PROTECTED:
+        if unprotect is None:
+            raise TemplateStoreError("Journal record is encrypted but no decryptor was given")
+        payload = unprotect(payload)
+        kind &= ~RECORD_PROTECTED
+    if kind == RECORD_ADD:
+        (meta_len,) = struct.unpack_from("<I", payload)
+        meta = json.loads(payload[4:4 + meta_len].decode("utf-8"))
+        templates = np.frombuffer(payload, dtype="<f4", offset=4 + meta_len)
+        width = meta["dim"]
+        if (dim and width != dim) or width == 0 or templates.shape[0] % width:
+            raise TemplateStoreError("Journal record templates do not match the gallery dimension")
+        return RECORD_ADD, meta["user"], templates.reshape(-1, width), meta.get("adapted", False)
+    if kind in (RECORD_RETIRE, RECORD_ADAPTED):
+        return kind, np.frombuffer(payload, dtype="<i8").astype(np.int64)
+    if kind == RECORD_IDS:
+        values = np.frombuffer(payload, dtype="<i8").astype(np.int64)
+        if len(values) == 0:
+            raise TemplateStoreError("Template ID record is empty")
+        return kind, values[1:], int(values[0])
+    raise TemplateStoreError(f"Unknown journal record kind {kind}")
+
+
+def _read_journal(f, offset: int) -> Tuple[List[Tuple[int, bytes]], int]:
+    """Return the (kind, payload) records from `offset` on and the end of the last intact one"""
+    f.seek(offset)
+    records = []
+    while True:
+        raw = f.read(_RECORD.size)
+        if len(raw) < _RECORD.size:
+            break
+        magic, kind, length, crc = _RECORD.unpack(raw)
+        payload = f.read(length) if magic == RECORD_MAGIC else b""
+        if magic != RECORD_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+            break  # Torn or corrupt tail
+        records.append((kind, payload))
+        offset += _RECORD.size + length
+    return records, offset
+
+
+def apply_records(gallery: TemplateGallery, records: Sequence[Record]) -> TemplateGallery:
+    """Return the gallery with journal records applied; rows keep their template IDs"""
+    state = journal_state(gallery)
+    if records and records[0][0] == RECORD_IDS:
+        # Stored IDs of the matrix rows, written by write_gallery
+        _, template_ids, next_id = records[0]
+        if len(template_ids) != len(gallery):
+            raise TemplateStoreError("Template ID record does not match the template count")
+        state = JournalState(template_ids, state.adapted, max(next_id, state.next_id))
+        records = records[1:]
+    if not records:
+        gallery.journal = state
+        return gallery
+    user_ids = list(gallery.user_ids)
+    blocks = [(gallery.templates, gallery.labels, state.template_ids, state.adapted)]
+    retired, marked = [], []
+    next_id, changes = state.next_id, state.changes
+    dim = gallery.dim if len(gallery) else 0
+    for record in records:
+        kind = record[0]
+        if kind == RECORD_ADD:
+            _, user_id, templates, adapted = record
+            if dim and templates.shape[1] != dim:
+                raise TemplateStoreError("Journal record templates do not match the gallery dimension")
+            dim = templates.shape[1]
+            if user_id not in user_ids:
+                user_ids.append(user_id)
+            n = templates.shape[0]
+            blocks.append((templates, np.full(n, user_ids.index(user_id), dtype=np.int32),
+                           np.arange(next_id, next_id + n, dtype=np.int64), np.full(n, bool(adapted))))
+            next_id += n
+            changes += 1
+        elif kind == RECORD_RETIRE:
+            retired.append(record[1])
+            changes += 1
+        elif kind == RECORD_ADAPTED:
+            marked.append(record[1])
+
+    blocks = [block for block in blocks if len(block[0])]
+    if not blocks:
+        result = TemplateGallery.empty(dim)
+        result.journal = JournalState(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool),
+                                      next_id, changes)
+        return result
+    if len(blocks) == 1 and not retired:
+        # Nothing added or dropped: keep the (possibly memory-mapped) matrix
+        templates, labels, ids, adapted = blocks[0]
+        keep = slice(None)
+    else:
+        templates, labels, ids, adapted = (np.concatenate(parts) for parts in zip(*blocks))
+        keep = ~np.isin(ids, np.concatenate(retired)) if retired else slice(None)
+    ids = ids[keep]
+    adapted = adapted[keep].copy()
+    if marked:
+        adapted |= np.isin(ids, np.concatenate(marked))
+    labels = labels[keep]
+
+    # Drop users left without templates
+    present = np.unique(labels)
+    remap = np.zeros(len(user_ids), dtype=np.int32)
+    remap[present] = np.arange(len(present), dtype=np.int32)
+    result = TemplateGallery([user_ids[i] for i in present],
+                             templates if isinstance(keep, slice) else templates[keep], remap[labels])
+    result.journal = JournalState(ids, adapted, next_id, changes)
+    return result
+
+
+def _stored_next_id(path: str) -> int:
+    """The first template ID an existing store has not issued (0 if there is none)"""
+    try:
+        with open(path, "rb") as f:
+            _, _, count, dim, _, _, data_offset, data_length = _read_header(f)
+            if data_length is None:
+                return count
+            raw_records, _ = _read_journal(f, data_offset + data_length)
+    except (OSError, TemplateStoreError):
+        return 0
+    next_id = count
+    if raw_records and raw_records[0][0] == RECORD_IDS:
+        next_id = _decode_record(RECORD_IDS, raw_records[0][1], dim, None)[2]
+    for kind, payload in raw_records:
+        if kind == RECORD_ADD:
+            next_id += _decode_record(kind, payload, dim, None)[2].shape[0]
+        elif kind == RECORD_ADD | RECORD_PROTECTED:
+            # Counting encrypted rows needs the key; the blob is at least as long
+            # as the rows, so skipping this many IDs never reuses one
+            next_id += len(payload) // (4 * dim) if dim else len(payload)
+    return next_id
+
+
+def write_gallery(path: str, gallery: TemplateGallery,
+                  protect: Optional[Callable[[bytes], bytes]] = None,
+                  compact: Optional[CompactTemplates] = None,
+                  journal: Optional[JournalState] = None) -> None:
+    """
+    Atomically write a gallery; `protect` encrypts the matrix (e.g.
+    dpapi_protect), `compact` adds a compact copy of the templates and
+    `journal` carries the rows' template IDs and adaptation flags. Without
+    it, rows get new IDs after every ID the file at `path` has issued.
+    """
+    users = json.dumps(gallery.user_ids).encode("utf-8")
+    labels = gallery.labels.astype("<i4").tobytes()
+    dim = gallery.dim if len(gallery) else 0
+    prefix_len = _HEADER.size + _DATA_LENGTH.size + len(users) + len(labels)
+    data_offset = _align(prefix_len)
+    data = gallery.templates.astype("<f4", copy=False).tobytes()
+    flags = 0
+    compact_dim = 0
+    if compact is not None and len(gallery):
+        if len(compact) != len(gallery) or compact.codec.input_dim != dim:
+            raise ValueError("Compact templates do not match the gallery")
+        compact_dim = compact.codec.dim
+        start, _, _, _ = _compact_offsets(len(gallery), dim, compact_dim)
+        data = b"".join([data, b"\0" * (start - len(data)),
+                         compact.codec.components.astype("<f4", copy=False).tobytes(),
+                         compact.scales.astype("<f4", copy=False).tobytes(),
+                         compact.codes.astype(np.int8, copy=False).tobytes()])
+        flags |= FLAG_COMPACT
+    if protect is not None:
+        data = protect(data)
+        flags |= FLAG_PROTECTED
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(gallery), dim,
+                          len(users), compact_dim, data_offset)
+    with store_lock(path):
+        # IDs already issued by the file being replaced are never handed out again
+        stored_next_id = _stored_next_id(path)
+        if journal is None:
+            journal = JournalState.fresh(len(gallery))
+            journal.template_ids += stored_next_id
+            journal.next_id += stored_next_id
+        next_id = max(journal.next_id, stored_next_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(_DATA_LENGTH.pack(len(data)))
+            f.write(users)
+            f.write(labels)
+            f.write(b"\0" * (data_offset - prefix_len))
+            f.write(data)
+            f.write(_encode_record((RECORD_IDS, journal.template_ids, next_id), None))
+            if np.any(journal.adapted):
+                f.write(_encode_record((RECORD_ADAPTED, journal.template_ids[journal.adapted]), None))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def _read_header(f) -> Tuple[int, int, int, int, int, int, int, Optional[int]]:
+    """Return (version, flags, count, dim, users length, compact dim, data offset, data length)"""
+    raw_header = f.read(_HEADER.size)
+    if len(raw_header) != _HEADER.size:
+        raise TemplateStoreError("Template file header is truncated")
+    magic, version, flags, count, dim, users_len, compact_dim, data_offset = \
+        _HEADER.unpack(raw_header)
+    if magic != MAGIC:
+        raise TemplateStoreError("Not a binary template file")
+    if version not in _SUPPORTED_VERSIONS:
+        raise TemplateStoreError(f"Unsupported template file version {version}")
+    data_length = None
+    if version >= 3:
+        raw_length = f.read(_DATA_LENGTH.size)
+        if len(raw_length) != _DATA_LENGTH.size:
+            raise TemplateStoreError("Template file header is truncated")
+        (data_length,) = _DATA_LENGTH.unpack(raw_length)
+    return version, flags, count, dim, users_len, compact_dim, data_offset, data_length
+
+
+def append_records(path: str, records: Sequence[Record],
+                   protect: Optional[Callable[[bytes], bytes]] = None) -> Tuple[int, int]:
+    """
+    Append journal records to a template file without rewriting it; cost is
+    proportional to the records, not the gallery. Returns the journal and
+    data sizes in bytes, e.g. to decide when to rewrite the file.
+    """
+    with store_lock(path), open(path, "r+b") as f:
+        _, _, _, _, _, _, data_offset, data_length = _read_header(f)
+        if data_length is None:
+            raise TemplateStoreError("Template file predates the journal and must be rewritten")
+        journal_start = data_offset + data_length
+        _, end = _read_journal(f, journal_start)
+        f.seek(end)
+        f.truncate()  # Drop a torn record left by an interrupted append
+        f.write(b"".join(_encode_record(record, protect) for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell() - journal_start, data_length
+
+
+def read_gallery(path: str,
+                 unprotect: Optional[Callable[[bytes], bytes]] = None) -> TemplateGallery:
+    """
+    Load a gallery and replay its journal. Unprotected matrices are
+    memory-mapped read-only, so loading costs no parsing or copying
+    regardless of gallery size; journal changes are applied in memory.
+    """
+    with open(path, "rb") as f:
+        version, flags, count, dim, users_len, compact_dim, data_offset, data_length = _read_header(f)
+        user_ids = json.loads(f.read(users_len).decode("utf-8"))
+        labels = np.frombuffer(f.read(4 * count), dtype="<i4").astype(np.int32)
+        if labels.shape[0] != count:
+            raise TemplateStoreError("Template file labels are truncated")
+
+        has_compact = bool(flags & FLAG_COMPACT) and count > 0 and compact_dim > 0
+        offsets = _compact_offsets(count, dim, compact_dim) if has_compact else None
+        data_size = offsets[3] if has_compact else 4 * count * dim
+        compact = None
+        if count == 0:
+            templates = np.zeros((0, dim), dtype=np.float32)
+        elif flags & FLAG_PROTECTED:
+            if unprotect is None:
+                raise TemplateStoreError("Template matrix is encrypted but no decryptor was given")
+            f.seek(data_offset)
+            data = unprotect(f.read() if data_length is None else f.read(data_length))
+            if len(data) < data_size:
+                raise TemplateStoreError("Template file data is truncated")
+            templates = np.frombuffer(data, dtype="<f4", count=count * dim).reshape(count, dim)
+            if has_compact:
+                components, scales, codes, _ = offsets
+                compact = CompactTemplates(
+                    CompactCodec(np.frombuffer(data, dtype="<f4", count=compact_dim * dim,
+                                               offset=components).reshape(compact_dim, dim)),
+                    np.frombuffer(data, dtype=np.int8, count=count * compact_dim,
+                                  offset=codes).reshape(count, compact_dim),
+                    np.frombuffer(data, dtype="<f4", count=count, offset=scales))
+        else:
+            if os.fstat(f.fileno()).st_size < data_offset + data_size:
+                raise TemplateStoreError("Template file matrix is truncated")
+            templates = np.memmap(path, dtype="<f4", mode="r",
+                                  offset=data_offset, shape=(count, dim))
+            if has_compact:
+                components, scales, codes, _ = offsets
+                compact = CompactTemplates(
+                    CompactCodec(np.memmap(path, dtype="<f4", mode="r", offset=data_offset + components,
+                                           shape=(compact_dim, dim))),
+                    np.memmap(path, dtype=np.int8, mode="r", offset=data_offset + codes,
+                              shape=(count, compact_dim)),
+                    np.memmap(path, dtype="<f4", mode="r", offset=data_offset + scales, shape=(count,)))
+
+        records, journal_bytes = [], 0
+        if data_length is not None:
+            journal_start = data_offset + data_length
+            raw_records, end = _read_journal(f, journal_start)
+            records = [_decode_record(kind, payload, dim, unprotect) for kind, payload in raw_records]
+            journal_bytes = end - journal_start
+
+    gallery = apply_records(TemplateGallery(user_ids, templates, labels), records)
+    gallery.journal.journal_bytes = journal_bytes
+    gallery.journal.data_bytes = data_length if data_length is not None else 4 * count * dim
+    if not gallery.journal.changes:
+        # The compact copy only describes the matrix, not journal additions
+        gallery.compact = compact
+    return gallery
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Unpickler that only accepts the numpy types legacy template files contain"""
+
+    _ALLOWED = {
+        ("numpy", "ndarray"), ("numpy", "dtype"),
+        ("numpy.core.multiarray", "_reconstruct"), ("numpy.core.multiarray", "scalar"),
+        ("numpy._core.multiarray", "_reconstruct"), ("numpy._core.multiarray", "scalar"),
+        ("numpy.core.numeric", "_frombuffer"), ("numpy._core.numeric", "_frombuffer"),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self._ALLOWED:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from template file")
+        return super().find_class(module, name)
+
+
+def read_legacy_pickle(path: str,
+                       unprotect: Optional[Callable[[bytes], bytes]] = None) -> TemplateGallery:
+    """Load a pre-binary template file (a pickled list or {"users": {...}} dict)"""
+    with open(path, "rb") as f:
+        blob = f.read()
+    data = unprotect(blob) if unprotect is not None else blob
+    stored = _LegacyUnpickler(io.BytesIO(data)).load()
+    if isinstance(stored, dict):
+        return TemplateGallery.from_mapping(stored["users"])
+    # Oldest format: one anonymous list of templates for the local user
+    return TemplateGallery.from_templates(stored)
+
+
+class TemplateCache:
+    """
+    Process-wide cache of the decoded gallery and its prepared matcher.
+
+    The file is only re-read when its modification time or size changes, so
+    repeated recognition attempts skip disk I/O and decoding entirely.
+    """
+
+    def __init__(self, loader: Callable[[], Optional[TemplateGallery]],
+                 prepare: Callable[[TemplateGallery], Any]):
+        self._loader = loader
+        self._prepare = prepare
+        # Re-entrant: a migrating loader saves, and saving invalidates the cache
+        self._lock = threading.RLock()
+        self._key = None
+        self._entry = (None, None)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[int, int, int, int]]:
+        # Rewrites go through a temp file and os.replace(), so the inode changes even
+        # when the size does and mtime is too coarse to tell the two files apart
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_ctime_ns, st.st_mtime_ns, st.st_size
+
+    def get(self, path: str) -> Tuple[Optional[TemplateGallery], Any]:
+        """Return (gallery, prepared matcher), reloading only if the file changed"""
+        with self._lock:
+            key = self._file_key(path)
+            if key is not None and key == self._key:
+                self.hits += 1
+                return self._entry
+            self.misses += 1
+            self._key = None
+            self._entry = (None, None)
+
+            gallery = self._loader()
+            if not gallery:
+                return None, None
+            entry = (gallery, self._prepare(gallery))
+            # Only cache what was read if the file did not change while loading
+            # (a writer, or a legacy migration); otherwise the next call reloads
+            if key is not None and self._file_key(path) == key:
+                self._key = key
+                self._entry = entry
+            return entry
+
+    def invalidate(self) -> None:
+        """Drop the cached gallery (and any memory map it holds) before the file is rewritten"""
+        with self._lock:
+            self._key = None
+            self._entry = (None, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -2,48 +2,182 @@ import os
 import sys
 import time
 import logging
+import queue
 import threading
-from typing import Optional, Tuple, List
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Tuple, List
 import cv2
-import pickle
 import numpy as np
-try:
-    import win32crypt
-    CryptProtectData = win32crypt.CryptProtectData
-    CryptUnprotectData = win32crypt.CryptUnprotectData
-except ImportError:
-    # pywin32 not installed or not on Windows
-    def CryptProtectData(data, *args, **kwargs):
-        return data
-
-    def CryptUnprotectData(data, *args, **kwargs):
-        return (None, data)
-from tkinter import Tk, Label, Button, messagebox
-from PIL import Image, ImageTk
+# tkinter, PIL and pywin32 are imported on first use so headless tools
+# (enrollment CLI, daemon, benchmarks) start fast and need no GUI stack
+from face_gallery import DEFAULT_USER_ID, TemplateGallery
+from feature_cache import FeatureCache
+from template_dedup import dedup_gallery
+from compact_templates import CompactMatcher, CompactTemplates
+from face_matcher import GalleryMatcher
+from face_detectors import FaceDetector, create_detector
+from face_tracking import FaceTracker
+from frame_quality import FrameQualityGate
+from frame_scheduler import AdaptiveFrameScheduler
+from result_reuse import ResultReuse
+from sequential_decision import ACCEPT, CONTINUE, SequentialDecision
+import metrics
+import template_store
 
 # Configuration
 TEMPLATE_FILE = os.path.expanduser(r"~\face_templates.dat")
 TOLERANCE = 0.7  # for OpenCV template matching (0.0 to 1.0, higher = stricter)
 CAMERA_INDEX = 0
-FRAME_SKIP = 2  # Process every nth frame for performance
+FRAME_SKIP = 2  # Process every nth frame when ADAPTIVE_FRAME_SKIP is off
+# Pick the frame skip at run time from measured processing time (see frame_scheduler.py):
+# every frame when there is headroom, fewer when the CPU is slow or contended
+ADAPTIVE_FRAME_SKIP = True
+FRAME_CPU_BUDGET = 0.6  # Fraction of wall time recognition may spend processing frames
+MAX_FRAME_SKIP = 8
+CAMERA_FPS = 30
+# Capture on a background thread so detection never waits on the camera
+CAMERA_BACKGROUND_CAPTURE = True
+CAMERA_BUFFER_SIZE = 1  # Frames kept by the background grabber (1 = latest only)
+CAMERA_WARMUP_FRAMES = 10  # Discarded once after opening while exposure settles
+CAMERA_RECONNECT_AFTER_SEC = 3.0  # Reopen the camera after this long without a frame
+PREVIEW_SIZE = (400, 300)  # Enrollment preview size
+PREVIEW_FPS = 15  # Upper bound on enrollment preview updates per second
 MIN_FACE_SIZE = (50, 50)  # Minimum face size to consider
+# Face detector backend (see face_detectors.py): "haar", "lbp" or "yunet"
+FACE_DETECTOR = "haar"
+FACE_DETECTOR_PARAMS = {}  # e.g. {"min_neighbors": 4} or {"model_file": "models/face_detection_yunet_2023mar.onnx"}
+DETECTION_SCALE = 1.0  # Detect on a frame downscaled by this factor (e.g. 0.5) and map boxes back
+# Track faces between frames and only scan the whole frame periodically
+FACE_TRACKING = True
+TRACKING_FULL_SCAN_INTERVAL = 10  # Processed frames between full-frame scans
+# Reuse the last results while the faces have not moved, for at most this many frames in a row
+RESULT_REUSE_MAX_FRAMES = 2  # 0 disables reuse
+RESULT_REUSE_MAX_DIFFERENCE = 3.0  # Mean gray-level change of a face that counts as "not moved"
+# Drop dark, overexposed, blurred and (in an empty scene) unchanged frames before detection
+FRAME_QUALITY_GATE = True
+QUALITY_BRIGHTNESS_RANGE = (25.0, 235.0)  # Acceptable mean gray level
+QUALITY_MIN_SHARPNESS = 12.0  # Laplacian variance of a 160-pixel-wide thumbnail
 LIVENESS_MATCHES_REQUIRED = 3
 LIVENESS_WINDOW_SEC = 5
+# Decide with a sequential probability ratio test over per-frame scores
+# (see sequential_decision.py) instead of counting LIVENESS_MATCHES_REQUIRED matches
+SEQUENTIAL_DECISION = True
+DECISION_FALSE_ACCEPT = 0.001  # Target probability of accepting an impostor
+DECISION_FALSE_REJECT = 0.05  # Target probability of rejecting the enrolled user
+# Typical best-match score of an enrolled face, calibrated from the gallery when it has
+# DECISION_CALIBRATION_MIN_SCORES templates with a same-user neighbour (leave-one-out scores)
+DECISION_GENUINE_MEAN = 0.85
+DECISION_CALIBRATION_MIN_SCORES = 3
+DECISION_IMPOSTOR_MEAN = 0.55  # Lowered if needed to keep the break-even score at or below TOLERANCE
+DECISION_SCORE_STD = 0.1
+DECISION_MIN_FRAMES = 2  # Never decide on a single frame
 RECOGNITION_INTERVAL_MS = 1000
+# Per-stage timing histograms and counters (see metrics.py); near-zero cost when off
+METRICS_ENABLED = False
+METRICS_EXPORT_FILE = None  # e.g. "face_unlock_metrics.prom" or ".json", written after each attempt
+ENROLL_WORKERS = 0  # Processes used for folder enrollment (0 = one per CPU core)
+ENROLL_CACHE_FILE = ".enroll_cache.npz"  # Per-image feature cache kept in the enrollment folder
+# Merge near-identical templates (burst shots) when enrolling a folder, see template_dedup.py
+ENROLL_DEDUP = True
+ENROLL_DEDUP_SIMILARITY = 0.95
+ENROLL_MAX_TEMPLATES_PER_USER = 30
+# DPAPI-encrypt the template matrix; encrypted files are decoded into memory
+# instead of being memory-mapped zero-copy
+ENCRYPT_TEMPLATES = True
+# Also store and match PCA-reduced int8 templates (see compact_templates.py):
+# far less memory and match work for large galleries, at a small accuracy cost
+COMPACT_TEMPLATES = False
+COMPACT_DIM = 128
+# Enrollment changes are appended to the template file's journal; the file is
+# rewritten in the background once the journal reaches this fraction of the matrix
+JOURNAL_COMPACT_RATIO = 0.25
+# Fold confident live captures from successful unlocks into the user's templates
+TEMPLATE_ADAPTATION = False
+ADAPT_MIN_SIMILARITY = 0.9  # Only captures this sure of the user are added...
+ADAPT_MAX_SIMILARITY = 0.98  # ...and only if they differ from what is already enrolled
+ADAPT_MAX_TEMPLATES_PER_USER = 10  # Oldest adapted templates are retired beyond this
 
 # Setup logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize OpenCV face detector
-face_cascade = cv2.CascadeClassifier(
-    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+metrics.registry.enabled = METRICS_ENABLED
+
+# Face detectors, created on first use and kept in a pool for the life of the
+# process. OpenCV detectors are not documented as thread-safe and several
+# cameras may be processed at once, so each detection borrows an idle
+# instance; LockScreen's per-attempt threads reuse them instead of reloading.
+_idle_detectors: List[FaceDetector] = []
+_detector_lock = threading.Lock()
+_legacy_cascade: Optional[cv2.CascadeClassifier] = None
+
+
+def _create_face_detector() -> FaceDetector:
+    try:
+        return create_detector(FACE_DETECTOR, DETECTION_SCALE, **FACE_DETECTOR_PARAMS)
+    except (OSError, RuntimeError, ValueError) as e:
+        logging.error(f"Face detector '{FACE_DETECTOR}' unavailable ({e}); using Haar instead")
+        return create_detector("haar", DETECTION_SCALE)
+
+
+@contextmanager
+def borrow_face_detector() -> Iterator[FaceDetector]:
+    """Use an idle configured face detector exclusively, creating one when none is idle"""
+    with _detector_lock:
+        detector = _idle_detectors.pop() if _idle_detectors else None
+    if detector is None:
+        detector = _create_face_detector()
+    try:
+        yield detector
+    finally:
+        with _detector_lock:
+            _idle_detectors.append(detector)
+
+
+def get_face_cascade() -> cv2.CascadeClassifier:
+    """Return the process-wide Haar cascade, loading it on first use"""
+    global _legacy_cascade
+    with _detector_lock:
+        if _legacy_cascade is None:
+            _legacy_cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        return _legacy_cascade
+
+
+def __getattr__(name):
+    # Keep `user_face_unlock.face_cascade` working without loading it at import
+    if name == "face_cascade":
+        return get_face_cascade()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def detect_faces(gray: np.ndarray, min_size: Tuple[int, int] = MIN_FACE_SIZE,
+                 max_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Detect faces in a grayscale image, returning (x, y, w, h) boxes"""
+    with borrow_face_detector() as detector:
+        return detector.detect(gray, min_size, max_size)
+
+
+def largest_face_features(gray: np.ndarray) -> Optional[np.ndarray]:
+    """Features of the largest face detected in a grayscale image, or None"""
+    faces = detect_faces(gray)
+    if len(faces) == 0:
+        return None
+    face_areas = [w * h for (x, y, w, h) in faces]
+    x, y, w, h = faces[int(np.argmax(face_areas))]
+    return extract_face_features(gray[y:y+h, x:x+w])
+
+
+FEATURE_SIZE = (64, 64)  # Face crops are resized to this before flattening
 
 
 def extract_face_features(face_img: np.ndarray) -> np.ndarray:
     """Extract simple features from a face image for comparison"""
     # Resize to standard size
-    face_img = cv2.resize(face_img, (64, 64))
+    face_img = cv2.resize(face_img, FEATURE_SIZE)
     # Convert to grayscale if needed
     if len(face_img.shape) == 3:
         face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
@@ -53,6 +187,46 @@ def extract_face_features(face_img: np.ndarray) -> np.ndarray:
     return face_img.flatten().astype(np.float32) / 255.0
 
 
+class BatchFeatureExtractor:
+    """
+    Extracts the features of every face in a grayscale frame into one
+    preallocated (faces x 4096) float32 buffer, producing the same values as
+    extract_face_features. Resize, equalization and scaling all write into
+    reused buffers, so steady-state frames allocate nothing. The returned
+    matrix is a view that the next call overwrites.
+    """
+
+    def __init__(self, capacity: int = 4):
+        width, height = FEATURE_SIZE
+        self._resized = np.empty((height, width), dtype=np.uint8)
+        self._equalized = np.empty((height, width), dtype=np.uint8)
+        self._buffer = np.empty((max(1, capacity), width * height), dtype=np.float32)
+
+    def extract(self, gray_frame: np.ndarray, faces) -> np.ndarray:
+        if len(faces) > self._buffer.shape[0]:
+            # Grow geometrically so a crowded scene reallocates only a few times
+            capacity = max(len(faces), 2 * self._buffer.shape[0])
+            self._buffer = np.empty((capacity, self._buffer.shape[1]), dtype=np.float32)
+        for i, (x, y, w, h) in enumerate(faces):
+            cv2.resize(gray_frame[y:y+h, x:x+w], FEATURE_SIZE, dst=self._resized)
+            cv2.equalizeHist(self._resized, dst=self._equalized)
+            np.divide(self._equalized, np.float32(255.0),
+                      out=self._buffer[i].reshape(self._equalized.shape))
+        return self._buffer[:len(faces)]
+
+
+# One extractor per thread, since its buffers are reused between calls
+_extractors = threading.local()
+
+
+def get_feature_extractor() -> BatchFeatureExtractor:
+    """Return this thread's batch feature extractor"""
+    extractor = getattr(_extractors, "extractor", None)
+    if extractor is None:
+        extractor = _extractors.extractor = BatchFeatureExtractor()
+    return extractor
+
+
 def compare_faces(features1: np.ndarray, features2: np.ndarray) -> float:
     """Compare two face feature vectors and return similarity score (0-1, higher = more similar)"""
     # Use normalized correlation
@@ -63,9 +237,33 @@ def compare_faces(features1: np.ndarray, features2: np.ndarray) -> float:
     return max(0.0, correlation)  # Ensure non-negative
 
 
+_dpapi = None
+
+
+def _load_dpapi():
+    """Import pywin32's DPAPI bindings on first use"""
+    global _dpapi
+    if _dpapi is None:
+        try:
+            import win32crypt
+            _dpapi = (win32crypt.CryptProtectData, win32crypt.CryptUnprotectData, True)
+        except ImportError:
+            # pywin32 not installed or not on Windows
+            _dpapi = (lambda data, *args, **kwargs: data,
+                      lambda data, *args, **kwargs: (None, data),
+                      False)
+    return _dpapi
+
+
+def dpapi_available() -> bool:
+    """True if Windows DPAPI encryption is available"""
+    return _load_dpapi()[2]
+
+
 def dpapi_protect(data_bytes: bytes) -> bytes:
     """Encrypt data using Windows DPAPI"""
     try:
+        CryptProtectData = _load_dpapi()[0]
         blob = CryptProtectData(data_bytes, None, None, None, None, 0)
         return blob
     except Exception as e:
@@ -76,6 +274,7 @@ def dpapi_protect(data_bytes: bytes) -> bytes:
 def dpapi_unprotect(blob: bytes) -> bytes:
     """Decrypt data using Windows DPAPI"""
     try:
+        CryptUnprotectData = _load_dpapi()[1]
         result = CryptUnprotectData(blob, None, None, None, 0)
         return result[1] if isinstance(result, tuple) else blob
     except Exception as e:
@@ -97,79 +296,350 @@ def validate_image_path(img_path: str) -> bool:
     return True
 
 
-def enroll_all_images_in_folder(folder: str = "face_model") -> bool:
-    """Enroll faces from all images in the folder and save all templates"""
-    templates = []
+def list_enrollment_images(folder: str, user_id: str = DEFAULT_USER_ID) -> Dict[str, List[str]]:
+    """
+    Map user IDs to image paths: images directly in the folder belong to
+    `user_id`, images in a subfolder belong to the user named after it.
+    """
     valid_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+    images = {}
+    for entry in sorted(os.listdir(folder)):
+        path = os.path.join(folder, entry)
+        if os.path.isdir(path):
+            user_images = [os.path.join(path, f) for f in sorted(os.listdir(path))
+                           if f.lower().endswith(valid_extensions)]
+            if user_images:
+                images.setdefault(entry, []).extend(user_images)
+        elif entry.lower().endswith(valid_extensions):
+            images.setdefault(user_id, []).append(path)
+    return images
+
+
+def enrollment_fingerprint() -> str:
+    """Detector and feature parameters that enrollment features depend on"""
+    with borrow_face_detector() as detector:
+        return f"{detector.describe()}|{MIN_FACE_SIZE}|equalized64x64"
+
+
+def _read_enrollment_features(img_path: str) -> Tuple[bool, Optional[np.ndarray]]:
+    """Return (image could be read, features of its largest face or None)"""
+    img = cv2.imread(img_path)
+    if img is None:
+        logging.warning(f"Failed to load image: {img_path}")
+        return False, None
+    features = largest_face_features(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    if features is None:
+        logging.warning(f"No face found in image: {img_path}")
+    return True, features
+
+
+def extract_enrollment_features(img_path: str) -> Optional[np.ndarray]:
+    """Detect the largest face in an image file and return its features"""
+    return _read_enrollment_features(img_path)[1]
+
+
+def _init_enroll_worker():
+    # One OpenCV thread per process; the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def _extract_many(img_paths: List[str], workers: int) -> List[Tuple[bool, Optional[np.ndarray]]]:
+    """
+    Extract enrollment features for several images, across processes when
+    worthwhile. Returns (readable, features) per image, as _read_enrollment_features.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(img_paths) <= 1:
+        return [_read_enrollment_features(path) for path in img_paths]
+    workers = min(workers, len(img_paths))
+    chunksize = max(1, len(img_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_enroll_worker) as pool:
+        return list(pool.map(_read_enrollment_features, img_paths, chunksize=chunksize))
+
+
+def enroll_all_images_in_folder(folder: str = "face_model",
+                                user_id: str = DEFAULT_USER_ID,
+                                workers: int = ENROLL_WORKERS,
+                                use_cache: bool = True) -> bool:
+    """
+    Enroll faces from all images in the folder (one subfolder per extra user) and save all templates.
+    Images whose content and extraction parameters are unchanged since the last
+    run are taken from the feature cache; the rest are processed in parallel.
+    """
     if not os.path.exists(folder):
         logging.error(f"Face model folder not found: {folder}")
         return False
-    image_files = [f for f in os.listdir(
-        folder) if f.lower().endswith(valid_extensions)]
-    if not image_files:
+    user_images = list_enrollment_images(folder, user_id)
+    if not user_images:
         logging.error("No valid images found in face_model folder")
         return False
-    for img_file in image_files:
-        img_path = os.path.join(folder, img_file)
-        logging.info(f"Processing image: {img_path}")
-        img = cv2.imread(img_path)
-        if img is None:
-            logging.warning(f"Failed to load image: {img_path}")
-            continue
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=MIN_FACE_SIZE
-        )
-        if len(faces) == 0:
-            logging.warning(f"No face found in image: {img_path}")
-            continue
-        # Use largest face
-        face_areas = [w * h for (x, y, w, h) in faces]
-        largest_face_idx = np.argmax(face_areas)
-        x, y, w, h = faces[largest_face_idx]
-        face_img = gray[y:y+h, x:x+w]
-        features = extract_face_features(face_img)
-        templates.append(features)
-    if not templates:
+    image_files = [(uid, path) for uid, paths in user_images.items() for path in paths]
+
+    protect = dpapi_protect if ENCRYPT_TEMPLATES and dpapi_available() else None
+    cache_path = os.path.join(folder, ENROLL_CACHE_FILE)
+    if use_cache:
+        cache = FeatureCache.load(cache_path, enrollment_fingerprint(), unprotect=dpapi_unprotect)
+    else:
+        cache = FeatureCache(enrollment_fingerprint())
+    keys = {path: cache.key_for(path) for _, path in image_files}
+    pending = [path for path, key in keys.items() if key not in cache]
+    logging.info(f"Processing {len(pending)} new or changed images "
+                 f"({len(keys) - len(pending)} unchanged, from cache)")
+    for path, (readable, features) in zip(pending, _extract_many(pending, workers)):
+        # Only a definite "no face" is cached; unreadable images are retried next run
+        if readable:
+            cache.put(keys[path], features)
+
+    enrolled = {}
+    for uid, img_path in image_files:
+        features = cache.get(keys[img_path])
+        if features is not None:
+            enrolled.setdefault(uid, []).append(features)
+    if use_cache:
+        # Drop entries for images that were deleted or changed
+        cache.save(cache_path, keep=keys.values(), protect=protect)
+    if not enrolled:
         logging.error("No faces enrolled from images.")
         return False
     # Save all templates
-    data = pickle.dumps(templates)
-    protected = dpapi_protect(data)
-    with open(TEMPLATE_FILE, "wb") as f:
-        f.write(protected)
+    gallery = TemplateGallery.from_mapping(enrolled)
+    if ENROLL_DEDUP:
+        gallery, report = dedup_gallery(gallery, ENROLL_DEDUP_SIMILARITY,
+                                        ENROLL_MAX_TEMPLATES_PER_USER, TOLERANCE)
+        logging.info(f"Template dedup: {report.summary()}")
+    save_gallery(gallery)
     logging.info(
-        f"Enrolled {len(templates)} face templates from {len(image_files)} images.")
+        f"Enrolled {len(gallery)} face templates for {len(gallery.user_ids)} users "
+        f"from {len(image_files)} images.")
     return True
 
 
-def load_templates() -> Optional[List[np.ndarray]]:
-    """Load all enrolled face templates"""
+def enroll_from_image(img_path: str, user_id: str = DEFAULT_USER_ID) -> bool:
+    """Add the face in one image to a user's templates, keeping everything else enrolled"""
+    if not validate_image_path(img_path):
+        return False
+    features = extract_enrollment_features(img_path)
+    if features is None:
+        return False
+    with _store_lock():
+        gallery, _ = get_cached_gallery() if os.path.exists(TEMPLATE_FILE) else (None, None)
+        if gallery is not None and gallery.dim != features.shape[0]:
+            # Enrolled with other feature parameters: start over
+            del gallery
+            save_gallery(TemplateGallery.from_templates([features], user_id))
+            count = 1
+        else:
+            count = len(gallery.templates_for(user_id)) + 1 if gallery is not None else 1
+            update_templates([template_store.add_record(user_id, [features])])
+    logging.info(f"Enrolled {img_path} for {user_id} ({count} templates)")
+    return True
+
+
+def _store_lock() -> template_store.StoreLock:
+    """
+    Serializes template file updates (appends, rewrites and background
+    compaction) across threads and processes: the lock screen, enrollment
+    tools and the daemon may all change the same file
+    """
+    return template_store.store_lock(TEMPLATE_FILE)
+
+
+_compaction_thread: Optional[threading.Thread] = None
+
+
+def _template_protector():
+    return dpapi_protect if ENCRYPT_TEMPLATES and dpapi_available() else None
+
+
+def save_gallery(gallery: TemplateGallery) -> None:
+    """Write the multi-user template gallery to the binary template store"""
+    with _store_lock():
+        # Release the cached (possibly memory-mapped) gallery before replacing the file
+        template_cache.invalidate()
+        compact = None
+        if COMPACT_TEMPLATES and len(gallery):
+            compact = CompactTemplates.from_templates(gallery.templates, COMPACT_DIM)
+        template_store.write_gallery(TEMPLATE_FILE, gallery, protect=_template_protector(),
+                                     compact=compact, journal=gallery.journal)
+
+
+def update_templates(records: List[template_store.Record]) -> None:
+    """
+    Add or retire templates (template_store journal records). They are
+    appended to the template file, so the cost follows the change rather
+    than the gallery size; older files are rewritten once instead.
+    """
+    with _store_lock():
+        if os.path.exists(TEMPLATE_FILE) and template_store.is_binary_store(TEMPLATE_FILE):
+            try:
+                journal_bytes, data_bytes = template_store.append_records(
+                    TEMPLATE_FILE, records, protect=_template_protector())
+                if journal_bytes > JOURNAL_COMPACT_RATIO * data_bytes:
+                    _start_compaction()
+                return
+            except template_store.TemplateStoreError as e:
+                logging.info(f"Rewriting template file: {e}")
+        gallery = load_gallery() if os.path.exists(TEMPLATE_FILE) else None
+        save_gallery(template_store.apply_records(gallery or TemplateGallery.empty(), records))
+
+
+def compact_template_store() -> bool:
+    """Rewrite the template file with its journal folded in, so it memory-maps zero-copy again"""
+    with _store_lock():
+        gallery = load_gallery()
+        if gallery is None or not gallery.journal.changes:
+            return False
+        save_gallery(gallery)
+        logging.info(f"Compacted template file to {len(gallery)} templates")
+        return True
+
+
+def _start_compaction() -> None:
+    global _compaction_thread
+    if _compaction_thread is not None and _compaction_thread.is_alive():
+        return
+
+    def compact():
+        try:
+            compact_template_store()
+        except Exception as e:
+            # The journal stays valid; compaction is retried after the next update
+            logging.warning(f"Template file compaction failed: {e}")
+
+    # Not a daemon thread, so a short-lived enrollment process finishes the rewrite
+    _compaction_thread = threading.Thread(target=compact, name="template-compaction")
+    _compaction_thread.start()
+
+
+def _template_ids_for(gallery: TemplateGallery, user_id: str) -> np.ndarray:
+    if user_id not in gallery.user_ids:
+        return np.zeros(0, dtype=np.int64)
+    ids = template_store.journal_state(gallery).template_ids
+    return ids[gallery.labels == gallery.user_ids.index(user_id)]
+
+
+def replace_user_templates(user_id: str, templates: List[np.ndarray]) -> None:
+    """Retire a user's templates and enroll new ones, keeping everyone else enrolled"""
+    with _store_lock():
+        gallery, _ = get_cached_gallery() if os.path.exists(TEMPLATE_FILE) else (None, None)
+        if gallery is not None and gallery.dim != templates[0].shape[0]:
+            # Enrolled with other feature parameters: start over
+            del gallery
+            save_gallery(TemplateGallery.from_templates(templates, user_id))
+            return
+        records = [template_store.add_record(user_id, templates)]
+        if gallery is not None and user_id in gallery.user_ids:
+            records.insert(0, template_store.retire_record(_template_ids_for(gallery, user_id)))
+        update_templates(records)
+
+
+def adapt_templates(result: "RecognitionResult") -> bool:
+    """
+    Fold the best live capture of a successful unlock into the user's
+    templates when it is confidently the user but unlike anything enrolled,
+    retiring the oldest adapted templates beyond ADAPT_MAX_TEMPLATES_PER_USER
+    """
+    if not (TEMPLATE_ADAPTATION and result and result.features is not None):
+        return False
+    if not ADAPT_MIN_SIMILARITY <= result.similarity < ADAPT_MAX_SIMILARITY:
+        return False
+    with _store_lock():
+        gallery, _ = get_cached_gallery()
+        if not gallery or result.user_id not in gallery.user_ids \
+                or gallery.dim != result.features.shape[0]:
+            return False
+        state = template_store.journal_state(gallery)
+        adapted_ids = state.template_ids[
+            state.adapted & (gallery.labels == gallery.user_ids.index(result.user_id))]
+        records = [template_store.add_record(result.user_id, [result.features], adapted=True)]
+        excess = len(adapted_ids) + 1 - ADAPT_MAX_TEMPLATES_PER_USER
+        if excess > 0:
+            records.append(template_store.retire_record(np.sort(adapted_ids)[:excess]))
+        update_templates(records)
+    logging.info(f"Adapted templates of {result.user_id} with a live capture "
+                 f"(similarity {result.similarity:.3f})")
+    return True
+
+
+def load_gallery() -> Optional[TemplateGallery]:
+    """Load the enrolled template gallery for all users"""
     try:
         if not os.path.exists(TEMPLATE_FILE):
             logging.warning("No face templates found")
             return None
-        with open(TEMPLATE_FILE, "rb") as f:
-            blob = f.read()
-        data = dpapi_unprotect(blob)
-        templates = pickle.loads(data)
-        logging.info(f"Loaded {len(templates)} face templates")
-        return templates
+        if template_store.is_binary_store(TEMPLATE_FILE):
+            gallery = template_store.read_gallery(TEMPLATE_FILE, unprotect=dpapi_unprotect)
+        else:
+            # One-time migration from the old pickle format
+            logging.info("Migrating legacy template file to the binary template store")
+            gallery = template_store.read_legacy_pickle(TEMPLATE_FILE, unprotect=dpapi_unprotect)
+            save_gallery(gallery)
+        logging.info(
+            f"Loaded {len(gallery)} face templates for {len(gallery.user_ids)} users")
+        return gallery
     except Exception as e:
         logging.error(f"Failed to load templates: {e}")
         return None
 
 
+def make_matcher(gallery: TemplateGallery):
+    """Build the matcher for a gallery: compact when COMPACT_TEMPLATES is on, else full"""
+    if COMPACT_TEMPLATES:
+        compact = gallery.compact
+        if compact is None:
+            # Stored without a compact copy: build one in memory
+            compact = CompactTemplates.from_templates(gallery.templates, COMPACT_DIM)
+        return CompactMatcher(compact)
+    return GalleryMatcher(gallery.templates)
+
+
+# Decoded gallery and prepared matcher, shared across recognition attempts
+template_cache = template_store.TemplateCache(load_gallery, make_matcher)
+
+
+def get_cached_gallery() -> Tuple[Optional[TemplateGallery], Optional[GalleryMatcher]]:
+    """Return the enrolled gallery and its matcher, reloading only when TEMPLATE_FILE changes"""
+    gallery, matcher = template_cache.get(TEMPLATE_FILE)
+    logging.debug(f"Template cache stats: {template_cache.stats()}")
+    return gallery, matcher
+
+
+def load_templates() -> Optional[List[np.ndarray]]:
+    """Load all enrolled face templates"""
+    gallery = load_gallery()
+    if gallery is None:
+        return None
+    return list(gallery.templates)
+
+
 class CameraManager:
-    """Improved camera management with proper resource handling"""
+    """
+    Improved camera management with proper resource handling.
+
+    In background mode a grabber thread reads the camera continuously into a
+    small ring buffer, so consumers always get the freshest frame instead of
+    waiting on capture or processing stale buffered frames.
+    """
 
-    def __init__(self, camera_index: int = CAMERA_INDEX):
+    def __init__(self, camera_index: int = CAMERA_INDEX,
+                 background: bool = False, buffer_size: int = CAMERA_BUFFER_SIZE):
         self.camera_index = camera_index
         self.cap = None
         self.is_initialized = False
+        self.exhausted = False  # Only file-backed sources run out of frames
+        self.background = background
+        self.fps = CAMERA_FPS
+        self._frames = deque(maxlen=max(1, buffer_size))
+        self._frame_ready = threading.Condition()
+        self._stop_event = threading.Event()
+        self._grabber = None
+        # Background capture counters
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.last_frame_age = 0.0
+        self._total_frame_age = 0.0
+        self.last_capture_time = 0.0  # time.monotonic() of the device's last good frame
 
     def initialize(self) -> bool:
         """Initialize camera with optimized settings"""
@@ -183,11 +653,20 @@ class CameraManager:
             # Optimize camera settings for performance
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
+            self.cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
             # Reduce buffer to get latest frame
             self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or CAMERA_FPS
 
             self.is_initialized = True
+            if self.background:
+                # A fresh event per grabber: one stuck in a read after a timed-out
+                # release() must not be revived by re-initializing
+                self._stop_event = threading.Event()
+                self._grabber = threading.Thread(
+                    target=self._capture_loop, args=(self.cap, self._stop_event),
+                    name="camera-grabber", daemon=True)
+                self._grabber.start()
             logging.info(
                 f"Camera {self.camera_index} initialized successfully")
             return True
@@ -196,20 +675,107 @@ class CameraManager:
             logging.error(f"Camera initialization failed: {e}")
             return False
 
-    def read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
-        """Read a frame from the camera"""
+    def _capture_loop(self, cap, stop_event: threading.Event):
+        """
+        Grabber thread: keep the ring buffer filled with the newest frames.
+        The thread owns the capture and releases it on exit, so release()
+        never closes it underneath a blocked cap.read().
+        """
+        try:
+            while not stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    time.sleep(0.005)
+                    continue
+                with self._frame_ready:
+                    if len(self._frames) == self._frames.maxlen:
+                        # Oldest frame is overwritten without ever being consumed
+                        self.frames_dropped += 1
+                    self.last_capture_time = time.monotonic()
+                    self._frames.append((self.last_capture_time, frame))
+                    self.frames_captured += 1
+                    self._frame_ready.notify_all()
+        finally:
+            cap.release()
+
+    def read_frame(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Read a frame from the camera. In background mode this returns the
+        newest unconsumed frame (older buffered frames count as dropped) and
+        only waits, up to `timeout` seconds, when no new frame has arrived yet.
+        """
         if not self.is_initialized or self.cap is None:
             return False, None
 
-        ret, frame = self.cap.read()
-        return ret, frame
+        if not self.background:
+            ret, frame = self.cap.read()
+            if ret and frame is not None:
+                self.last_capture_time = time.monotonic()
+            return ret, frame
+
+        with self._frame_ready:
+            if not self._frames:
+                self._frame_ready.wait(timeout)
+            if not self._frames:
+                return False, None
+            captured_at, frame = self._frames.pop()
+            self.frames_dropped += len(self._frames)
+            self._frames.clear()
+            self.frames_delivered += 1
+            self.last_frame_age = time.monotonic() - captured_at
+            self._total_frame_age += self.last_frame_age
+        return True, frame
+
+    def grab_frame(self, timeout: float = 1.0) -> bool:
+        """
+        Advance past a frame without decoding it. In background mode this
+        waits for the next captured frame and discards it.
+        """
+        if not self.is_initialized or self.cap is None:
+            return False
+        if not self.background:
+            ret = self.cap.grab()
+            if ret:
+                self.last_capture_time = time.monotonic()
+            return ret
+
+        with self._frame_ready:
+            if not self._frames:
+                self._frame_ready.wait(timeout)
+            if not self._frames:
+                return False
+            self.frames_dropped += len(self._frames)
+            self._frames.clear()
+        return True
+
+    def capture_stats(self) -> dict:
+        """Dropped-frame and frame-age counters for background capture"""
+        delivered = self.frames_delivered
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_delivered": delivered,
+            "frames_dropped": self.frames_dropped,
+            "last_frame_age_ms": self.last_frame_age * 1000.0,
+            "avg_frame_age_ms": (self._total_frame_age / delivered * 1000.0) if delivered else 0.0,
+        }
 
     def release(self):
         """Properly release camera resources"""
         try:
-            if self.cap is not None:
+            self.is_initialized = False
+            if self._grabber is not None:
+                # The grabber releases the capture itself once its read returns
+                self._stop_event.set()
+                self._grabber.join(timeout=2.0)
+                if self._grabber.is_alive():
+                    logging.warning("Camera grabber still blocked in a read; "
+                                    "it will release the camera when the read returns")
+                self._grabber = None
+                logging.info(f"Camera capture stats: {self.capture_stats()}")
+            elif self.cap is not None:
                 self.cap.release()
-                self.is_initialized = False
+            if self.cap is not None:
+                self.cap = None
                 logging.info("Camera released")
         except Exception as e:
             logging.error(f"Error releasing camera: {e}")
@@ -221,90 +787,557 @@ class CameraManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.release()
 
+class CameraSession:
+    """
+    A camera that stays open across recognition attempts and enrollment.
+
+    Opening a webcam renegotiates its format and waits for auto-exposure,
+    which often takes longer than recognition itself, so the session opens
+    the device once, discards its warm-up frames once, and only reopens it
+    when it stops delivering frames. It can be passed anywhere a
+    CameraManager is accepted: leaving a `with` block keeps it open, and
+    close() releases it.
+    """
+
+    exhausted = False
+
+    def __init__(self, camera_index: int = CAMERA_INDEX,
+                 background: bool = CAMERA_BACKGROUND_CAPTURE,
+                 warmup_frames: int = CAMERA_WARMUP_FRAMES,
+                 reconnect_after: float = CAMERA_RECONNECT_AFTER_SEC,
+                 camera_factory: Optional[Callable[[], object]] = None):
+        self.camera_index = camera_index
+        self.background = background
+        self.warmup_frames = warmup_frames
+        self.reconnect_after = reconnect_after
+        # Builds the camera to open, e.g. a frame source for headless runs;
+        # defaults to a CameraManager for camera_index
+        self.camera_factory = camera_factory
+        self.camera: Optional[CameraManager] = None
+        self._lock = threading.Lock()
+        self._last_frame_time = 0.0
+        self._last_open_attempt = None
+        # Health counters
+        self.opens = 0
+        self.reconnects = 0
+        self.failed_opens = 0
+
+    @property
+    def is_initialized(self) -> bool:
+        camera = self.camera
+        return camera is not None and camera.is_initialized
+
+    @property
+    def fps(self) -> float:
+        camera = self.camera
+        return camera.fps if camera is not None else CAMERA_FPS
+
+    def open(self) -> bool:
+        """Open the camera and discard its warm-up frames (no-op when already open)"""
+        with self._lock:
+            if self.is_initialized:
+                return True
+            self._last_open_attempt = time.monotonic()
+            start = time.perf_counter()
+            if self.camera_factory is not None:
+                camera = self.camera_factory()
+            else:
+                camera = CameraManager(self.camera_index, background=self.background)
+            if not camera.initialize():
+                camera.release()
+                self.failed_opens += 1
+                return False
+            # Let exposure and white balance settle before anything is recognized
+            for _ in range(self.warmup_frames):
+                camera.read_frame()
+            self.camera = camera
+            self.opens += 1
+            self._last_frame_time = time.monotonic()
+            logging.info(f"Camera session opened in {time.perf_counter() - start:.2f}s")
+            return True
+
+    def close(self):
+        """Release the camera"""
+        with self._lock:
+            if self.camera is not None:
+                self.camera.release()
+                self.camera = None
+
+    def reconnect(self) -> bool:
+        """Close and reopen the camera"""
+        logging.warning(f"Camera {self.camera_index} stopped delivering frames; reconnecting")
+        self.reconnects += 1
+        self.close()
+        return self.open()
+
+    def _last_capture(self) -> float:
+        """When the device last produced a frame: the grabber's capture time when it
+        has one, so an idle consumer does not make a working camera look stalled"""
+        device_time = getattr(self.camera, "last_capture_time", 0.0) or 0.0
+        return max(self._last_frame_time, device_time)
+
+    def healthy(self) -> bool:
+        """Open and delivering frames recently"""
+        return (self.is_initialized
+                and time.monotonic() - self._last_capture() < self.reconnect_after)
+
+    def ensure_open(self) -> bool:
+        """Open, or reopen a stalled camera, retrying at most every `reconnect_after` seconds"""
+        if self.healthy():
+            return True
+        # Nothing captured for a while; without a grabber that only means nobody
+        # read. Try one frame before paying for a reconnect.
+        if self.is_initialized and self.camera.grab_frame():
+            self._last_frame_time = time.monotonic()
+            return True
+        if (self._last_open_attempt is not None
+                and time.monotonic() - self._last_open_attempt < self.reconnect_after):
+            return self.is_initialized
+        if self.is_initialized:
+            return self.reconnect()
+        return self.open()
+
+    def read_frame(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.ensure_open():
+            return False, None
+        ret, frame = self.camera.read_frame(timeout)
+        if ret and frame is not None:
+            self._last_frame_time = time.monotonic()
+        return ret, frame
+
+    def grab_frame(self) -> bool:
+        if not self.ensure_open():
+            return False
+        ret = self.camera.grab_frame()
+        if ret:
+            self._last_frame_time = time.monotonic()
+        return ret
+
+    def health(self) -> dict:
+        """Session state and counters, plus the current camera's capture stats"""
+        camera = self.camera
+        return {
+            "open": self.is_initialized,
+            "healthy": self.healthy(),
+            "opens": self.opens,
+            "reconnects": self.reconnects,
+            "failed_opens": self.failed_opens,
+            "seconds_since_frame": time.monotonic() - self._last_capture() if self.opens else None,
+            "capture": camera.capture_stats() if hasattr(camera, "capture_stats") else None,
+        }
+
+    def __enter__(self):
+        self.ensure_open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Stay open for the next attempt; close() releases the camera
+        pass
+
+
+def _lap(timings: Optional[Dict[str, List[float]]], stage: str, since: float) -> float:
+    """Record the time spent in a stage and return the current time"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings.setdefault(stage, []).append(now - since)
+    metrics.registry.observe_stage(stage, now - since)
+    return now
+
+
+def process_frame(frame: np.ndarray, matcher: GalleryMatcher,
+                  tracker: Optional[FaceTracker] = None,
+                  timings: Optional[Dict[str, List[float]]] = None,
+                  features_out: Optional[List[np.ndarray]] = None,
+                  reuse: Optional[ResultReuse] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detect, extract and match every face in a frame. Returns the best
+    template index and similarity for each face. When `timings` is given,
+    the seconds spent in each stage are appended to it; stage histograms are
+    also fed when metrics are enabled. When `features_out` is given, a copy
+    of each face's features is appended to it. With `reuse`, a frame whose
+    faces look unchanged since the last scored frame gets that frame's
+    results without detection or matching (and adds no features);
+    `reuse.last_hit` then tells the caller they are not new evidence.
+    """
+    timed = timings is not None or metrics.registry.enabled
+    t = time.perf_counter() if timed else 0.0
+
+    # Convert to grayscale for face detection
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if timed:
+        t = _lap(timings, "grayscale", t)
+
+    if reuse is not None:
+        reused = reuse.lookup(gray_frame)
+        if reused is not None:
+            metrics.registry.inc("frames_reused")
+            return reused
+
+    # Detect faces using OpenCV, searching near tracked faces when possible
+    faces = tracker.detect(gray_frame) if tracker is not None else detect_faces(gray_frame)
+    if timed:
+        t = _lap(timings, "detect", t)
+        metrics.registry.observe("faces_per_frame", len(faces), metrics.COUNT_BUCKETS)
+    if len(faces) == 0:
+        best_idx, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if reuse is not None:
+            reuse.store(gray_frame, faces, best_idx, best_scores)
+        return best_idx, best_scores
+
+    # Extract features for all detected faces into a reused buffer
+    features = get_feature_extractor().extract(gray_frame, faces)
+    if features_out is not None:
+        features_out.extend(features.copy())
+    if timed:
+        t = _lap(timings, "extract", t)
+
+    # Compare all faces with all templates at once
+    best_idx, best_scores = matcher.best_match(features)
+    if timed:
+        _lap(timings, "match", t)
+        metrics.registry.observe("comparisons_per_frame",
+                                 len(faces) * matcher.comparisons_per_query, metrics.COUNT_BUCKETS)
+    if reuse is not None:
+        reuse.store(gray_frame, faces, best_idx, best_scores)
+    return best_idx, best_scores
+
+
+@dataclass
+class RecognitionResult:
+    """Outcome of a liveness sequence; truthy when a user was recognized"""
+    matched: bool
+    user_id: Optional[str] = None
+    similarity: float = 0.0
+    matches: int = 0
+    cancelled: bool = False
+    # Features of the best-scoring capture of the recognized user (TEMPLATE_ADAPTATION)
+    features: Optional[np.ndarray] = None
+
+    def __bool__(self) -> bool:
+        return self.matched
+
+
+@dataclass
+class RecognitionProgress:
+    """Progress event from a running liveness sequence"""
+    stage: str  # "started", "evidence" (a frame with faces) or "finished"
+    elapsed: float
+    user_id: Optional[str] = None  # Best-scoring user so far
+    similarity: float = 0.0
+    matches: int = 0
+    matched: bool = False
+
+
+def decision_means(gallery: TemplateGallery) -> Tuple[float, float]:
+    """Genuine and impostor score means for the sequential decision, calibrated from `gallery`"""
+    genuine = DECISION_GENUINE_MEAN
+    scores = gallery.leave_one_out_scores()
+    if len(scores) >= DECISION_CALIBRATION_MIN_SCORES:
+        # Below TOLERANCE most genuine frames would not count as matches at all
+        genuine = max(float(np.mean(scores)), TOLERANCE)
+    return genuine, min(DECISION_IMPOSTOR_MEAN, 2 * TOLERANCE - genuine)
+
+
 # Optimized liveness detection with better performance and security
 
 
-def is_live_sequence(matches_required: int = LIVENESS_MATCHES_REQUIRED,
-                     window_sec: int = LIVENESS_WINDOW_SEC) -> bool:
+def is_live_sequence(matches_required: Optional[int] = None,
+                     window_sec: int = LIVENESS_WINDOW_SEC,
+                     camera=None,
+                     gallery: Optional[TemplateGallery] = None,
+                     matcher: Optional[GalleryMatcher] = None,
+                     cancel: Optional[threading.Event] = None,
+                     progress: Optional[Callable[[RecognitionProgress], None]] = None
+                     ) -> RecognitionResult:
     """
-    Enhanced liveness detection with frame skipping and better face validation
+    Enhanced liveness detection with frame skipping and better face validation.
+    Identifies which enrolled user matched (1:N) against the whole gallery.
+    The attempt succeeds after `matches_required` matches (default
+    LIVENESS_MATCHES_REQUIRED); with SEQUENTIAL_DECISION it also ends as soon
+    as the accumulated evidence accepts or rejects (an explicit
+    `matches_required` is kept as a floor on matching frames).
+    `camera` and `gallery` override the webcam and the enrolled templates,
+    e.g. to replay recorded frames (see frame_sources.py); `matcher` supplies
+    a ready-made matcher whose template indices line up with `gallery`.
+    Setting `cancel` stops the attempt at the next frame; `progress` is
+    called from this thread with RecognitionProgress events.
     """
-    templates = load_templates()
-    if not templates:
+    if gallery is not None:
+        if matcher is None and gallery:
+            matcher = make_matcher(gallery)
+    else:
+        # The gallery is pre-normalized once and cached, so retries skip disk I/O
+        # and each frame is scored with one matrix product
+        gallery, matcher = get_cached_gallery()
+    if not gallery:
         logging.error("No templates available for recognition")
-        return False
+        return RecognitionResult(False)
 
-    with CameraManager() as camera:
+    if camera is None:
+        camera = CameraManager(background=CAMERA_BACKGROUND_CAPTURE)
+    with camera:
         if not camera.is_initialized:
             logging.error("Failed to initialize camera for liveness detection")
-            return False
-
+            return RecognitionResult(False)
+
+        tracker = FaceTracker(detect_faces, MIN_FACE_SIZE,
+                              full_scan_interval=TRACKING_FULL_SCAN_INTERVAL)
+        scheduler = None
+        if ADAPTIVE_FRAME_SKIP:
+            fps = getattr(camera, "fps", None) or CAMERA_FPS
+            scheduler = AdaptiveFrameScheduler(1.0 / fps, cpu_budget=FRAME_CPU_BUDGET,
+                                               max_skip=MAX_FRAME_SKIP)
+        reuse = None
+        if RESULT_REUSE_MAX_FRAMES > 0:
+            reuse = ResultReuse(RESULT_REUSE_MAX_DIFFERENCE, RESULT_REUSE_MAX_FRAMES)
+        quality_gate = None
+        if FRAME_QUALITY_GATE:
+            quality_gate = FrameQualityGate(QUALITY_BRIGHTNESS_RANGE, QUALITY_MIN_SHARPNESS)
+        decision = None
+        if SEQUENTIAL_DECISION:
+            min_frames = max(DECISION_MIN_FRAMES, matches_required or 0)
+            genuine_mean, impostor_mean = decision_means(gallery)
+            decision = SequentialDecision(
+                genuine_mean, impostor_mean, DECISION_SCORE_STD,
+                DECISION_FALSE_ACCEPT, DECISION_FALSE_REJECT, min_frames, min_score=TOLERANCE)
+        if matches_required is None:
+            matches_required = LIVENESS_MATCHES_REQUIRED
+
+        # Matches are counted per user; the first user to reach the target wins
+        user_matches = {}
+        best_similarity = {}
+        best_features = {}  # Best capture per user, kept for template adaptation
+        frame_features = [] if TEMPLATE_ADAPTATION else None
         matches = 0
+        matched_user = None
         start_time = time.time()
         frame_count = 0
         valid_detections = 0
 
-        logging.info(
-            f"Starting liveness detection (need {matches_required} matches in {window_sec}s)")
-
-        while time.time() - start_time < window_sec and matches < matches_required:
-            ret, frame = camera.read_frame()
-            if not ret or frame is None:
+        if decision is not None:
+            logging.info(f"Starting liveness detection (sequential decision with genuine mean "
+                         f"{genuine_mean:.3f}, at least {decision.min_frames} matching frames, "
+                         f"or {matches_required} matches within {window_sec}s)")
+        else:
+            logging.info(
+                f"Starting liveness detection (need {matches_required} matches in {window_sec}s)")
+        if progress is not None:
+            progress(RecognitionProgress("started", 0.0))
+
+        while time.time() - start_time < window_sec:
+            if cancel is not None and cancel.is_set():
+                break
+            # Skip frames for performance. Skipped frames are grabbed without
+            # decoding. With a fixed FRAME_SKIP, background capture already
+            # drops stale frames, so it needs no skipping.
+            if scheduler is not None:
+                process = scheduler.should_process()
+            elif camera.background:
+                process = True
+            else:
+                frame_count += 1
+                process = frame_count % FRAME_SKIP == 0
+            if not process:
+                camera.grab_frame()
+                metrics.registry.inc("frames_skipped")
                 continue
 
-            frame_count += 1
-
-            # Skip frames for performance (process every nth frame)
-            if frame_count % FRAME_SKIP != 0:
+            if metrics.registry.enabled:
+                capture_start = time.perf_counter()
+                ret, frame = camera.read_frame()
+                metrics.registry.observe_stage("capture", time.perf_counter() - capture_start)
+            else:
+                ret, frame = camera.read_frame()
+            if not ret or frame is None:
+                metrics.registry.inc("frames_failed")
+                if camera.exhausted:
+                    break
                 continue
 
             try:
-                # Convert to grayscale for face detection
-                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-                # Detect faces using OpenCV
-                faces = face_cascade.detectMultiScale(
-                    gray_frame,
-                    scaleFactor=1.1,
-                    minNeighbors=5,
-                    minSize=MIN_FACE_SIZE
-                )
-
-                if len(faces) == 0:
+                process_start = time.perf_counter()
+                if quality_gate is not None:
+                    reason = quality_gate.check(frame)
+                    if reason is not None:
+                        metrics.registry.inc(f"frames_rejected_{reason}")
+                        if scheduler is not None:
+                            scheduler.record(time.perf_counter() - process_start)
+                        continue
+                metrics.registry.inc("frames_processed")
+                if frame_features is not None:
+                    frame_features.clear()
+                best_idx, best_scores = process_frame(
+                    frame, matcher, tracker if FACE_TRACKING else None,
+                    features_out=frame_features, reuse=reuse)
+                if scheduler is not None:
+                    scheduler.record(time.perf_counter() - process_start)
+                    metrics.registry.set_gauge("frame_skip", scheduler.skip)
+                    metrics.registry.set_gauge("frame_processing_rate", scheduler.processing_rate)
+                if quality_gate is not None:
+                    quality_gate.record(len(best_idx) > 0)
+                if len(best_idx) == 0:
                     continue
 
-                valid_detections += 1
-
-                # Process each detected face
-                for (x, y, w, h) in faces:
-                    # Extract face region
-                    face_img = gray_frame[y:y+h, x:x+w]
-
-                    # Extract features
-                    features = extract_face_features(face_img)
-
-                    # Compare with all templates
-                    for idx, template in enumerate(templates):
-                        similarity = compare_faces(template, features)
+                observations = [(gallery.user_for(idx), float(similarity))
+                                for idx, similarity in zip(best_idx, best_scores)]
+                # A reused result is the last scored frame again: it saves CPU and keeps
+                # the progress display live, but is no new evidence for matches or the decision
+                reused = reuse is not None and reuse.last_hit
+                if not reused:
+                    valid_detections += 1
+                    for face, (idx, (user_id, similarity)) in enumerate(zip(best_idx, observations)):
+                        if similarity > best_similarity.get(user_id, -1.0):
+                            best_similarity[user_id] = similarity
+                            if frame_features:
+                                best_features[user_id] = frame_features[face]
                         if similarity >= TOLERANCE:
-                            matches += 1
+                            user_matches[user_id] = user_matches.get(user_id, 0) + 1
+                            if user_matches[user_id] > matches:
+                                matches = user_matches[user_id]
+                                matched_user = user_id
                             logging.info(
-                                f"Face match {matches}/{matches_required} (template {idx+1}, similarity: {similarity:.3f})")
-                            break
+                                f"Face match {user_matches[user_id]}/{matches_required} for {user_id} "
+                                f"(template {idx+1}, similarity: {similarity:.3f})")
+
+                if progress is not None:
+                    user_id, similarity = max(observations, key=lambda o: o[1])
+                    progress(RecognitionProgress("evidence", time.time() - start_time, user_id,
+                                                 similarity, user_matches.get(user_id, 0)))
+                if reused:
+                    continue
+
+                if decision is not None and decision.update(observations) != CONTINUE:
+                    break
+                if matches >= matches_required:
+                    break
 
             except Exception as e:
                 logging.error(f"Error during face recognition: {e}")
                 continue
 
-        elapsed_time = time.time() - start_time
-        logging.info(f"Liveness check completed: {matches}/{matches_required} matches, "
-                     f"{valid_detections} valid detections in {elapsed_time:.1f}s")
+        # The match count still unlocks when the decision is undecided, so the
+        # sequential test can only end an attempt earlier than counting would
+        if decision is not None and decision.decision == ACCEPT:
+            accepted = True
+            matched_user = decision.user_id
+            matches = user_matches.get(matched_user, 0)
+        else:
+            accepted = matches >= matches_required
+        cancelled = cancel is not None and cancel.is_set() and not accepted
+        if cancelled:
+            accepted = False
+            logging.info("Liveness check cancelled")
 
-        return matches >= matches_required
+        elapsed_time = time.time() - start_time
+        if decision is not None:
+            logging.info(f"Liveness check completed: {decision.decision} after {decision.frames} "
+                         f"frames with evidence, {matches}/{matches_required} matches, "
+                         f"{valid_detections} valid detections in {elapsed_time:.1f}s")
+        else:
+            logging.info(f"Liveness check completed: {matches}/{matches_required} matches, "
+                         f"{valid_detections} valid detections in {elapsed_time:.1f}s")
+        if FACE_TRACKING:
+            logging.info(f"Face tracking stats: {tracker.stats()}")
+        if scheduler is not None:
+            logging.info(f"Frame scheduler stats: {scheduler.stats()}")
+        if quality_gate is not None:
+            logging.info(f"Frame quality stats: {quality_gate.stats()}")
+        if reuse is not None:
+            logging.info(f"Result reuse stats: {reuse.stats()}")
+        if metrics.registry.enabled:
+            metrics.registry.observe_stage("attempt", elapsed_time)
+            metrics.registry.inc("attempts")
+            metrics.registry.inc("attempts_matched" if accepted else "attempts_failed")
+            if decision is not None:
+                metrics.registry.observe("decision_frames", decision.frames, metrics.COUNT_BUCKETS)
+            if METRICS_EXPORT_FILE:
+                try:
+                    metrics.registry.write(METRICS_EXPORT_FILE)
+                except OSError as e:
+                    logging.warning(f"Failed to export metrics: {e}")
+
+        if accepted:
+            result = RecognitionResult(True, matched_user, best_similarity[matched_user], matches,
+                                       features=best_features.get(matched_user))
+        else:
+            result = RecognitionResult(False, matches=matches, cancelled=cancelled)
+        if progress is not None:
+            progress(RecognitionProgress("finished", elapsed_time, result.user_id,
+                                         result.similarity, result.matches, result.matched))
+        return result
 
 # Enhanced GUI lock screen with better user experience
 
 
+class PreviewRenderer:
+    """
+    Prepares enrollment preview images on a worker thread so the Tk main
+    loop only has to paste them. Frames are downscaled with OpenCV before
+    the color conversion and handed over through a single-slot queue. A new
+    preview is only prepared once the UI has taken the previous one, so the
+    work follows what is actually displayed, capped at `fps`.
+    """
+
+    def __init__(self, camera, size: Tuple[int, int] = PREVIEW_SIZE, fps: float = PREVIEW_FPS):
+        self.camera = camera
+        self.size = size
+        self.interval = 1.0 / fps
+        self._slot = queue.Queue(maxsize=1)
+        self._consumed = threading.Event()
+        self._consumed.set()
+        self._stop_event = threading.Event()
+        self._frame_lock = threading.Lock()
+        self._frame = None
+        self._thread = threading.Thread(target=self._render_loop, name="preview-renderer", daemon=True)
+
+    @property
+    def latest_frame(self) -> Optional[np.ndarray]:
+        """Full-resolution frame behind the most recent preview"""
+        with self._frame_lock:
+            return self._frame
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop_event.is_set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._consumed.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+    def _render_loop(self):
+        from PIL import Image
+
+        while not self._stop_event.is_set():
+            self._consumed.wait()
+            if self._stop_event.is_set():
+                break
+            started = time.monotonic()
+            ret, frame = self.camera.read_frame()
+            if not ret or frame is None:
+                continue
+            with self._frame_lock:
+                self._frame = frame
+            small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+            image = Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+            self._consumed.clear()
+            self._slot.put(image)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def poll(self):
+        """Return the newest prepared preview image, or None if there is none yet"""
+        try:
+            image = self._slot.get_nowait()
+        except queue.Empty:
+            return None
+        self._consumed.set()
+        return image
+
+
 class GuidedEnrollment:
     """Guided live enrollment for capturing 5 images with instructions"""
     INSTRUCTIONS = [
@@ -315,13 +1348,20 @@ class GuidedEnrollment:
         "5. Remove/Put on glasses if you have"
     ]
 
-    def __init__(self, root):
+    def __init__(self, root, user_id: str = DEFAULT_USER_ID,
+                 camera: Optional[CameraSession] = None):
+        from tkinter import Label, Button
+
         self.root = root
+        self.user_id = user_id
         self.current_step = 0
         self.captured_images = []
-        self.camera = CameraManager()
-        self.frame = None
-        self.is_camera_ready = self.camera.initialize()
+        # A shared session stays open for the lock screen afterwards
+        self._owns_camera = camera is None
+        self.camera = camera if camera is not None else CameraSession()
+        self.is_camera_ready = self.camera.open()
+        self.preview = PreviewRenderer(self.camera)
+        self._photo = None
 
         root.title("Guided Face Enrollment")
         root.geometry("800x600")
@@ -346,27 +1386,31 @@ class GuidedEnrollment:
             root, text="", fg="yellow", bg="black", font=("Segoe UI", 12))
         self.status_label.pack(pady=10)
 
+        if self.is_camera_ready:
+            self.preview.start()
         self.update_camera()
 
     def update_camera(self):
         if not self.is_camera_ready:
             self.status_label.config(text="Camera not available!")
             return
-        ret, frame = self.camera.read_frame()
-        if ret and frame is not None:
-            self.frame = frame
-            # Convert to PIL image for Tkinter
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            img = img.resize((400, 300))
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.image_panel.imgtk = imgtk
-            self.image_panel.config(image=imgtk)
-        self.root.after(50, self.update_camera)
+        if not self.preview.running:
+            return
+        image = self.preview.poll()
+        if image is not None:
+            if self._photo is None:
+                from PIL import ImageTk
+                self._photo = ImageTk.PhotoImage(image=image)
+                self.image_panel.config(image=self._photo)
+            else:
+                # Update the existing Tk image in place instead of allocating a new one
+                self._photo.paste(image)
+        self.root.after(int(self.preview.interval * 1000), self.update_camera)
 
     def capture_image(self):
-        if self.frame is not None:
-            self.captured_images.append(self.frame.copy())
+        frame = self.preview.latest_frame
+        if frame is not None:
+            self.captured_images.append(frame.copy())
             self.status_label.config(
                 text=f"Captured image {self.current_step+1}/5")
             self.capture_btn.config(state="disabled")
@@ -388,45 +1432,39 @@ class GuidedEnrollment:
         self.root.update()
         templates = []
         for idx, img in enumerate(self.captured_images):
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=MIN_FACE_SIZE
-            )
-            if len(faces) == 0:
+            features = largest_face_features(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+            if features is None:
                 self.status_label.config(
                     text=f"No face detected in image {idx+1}")
                 continue
-            face_areas = [w * h for (x, y, w, h) in faces]
-            largest_face_idx = np.argmax(face_areas)
-            x, y, w, h = faces[largest_face_idx]
-            face_img = gray[y:y+h, x:x+w]
-            features = extract_face_features(face_img)
             templates.append(features)
         if not templates:
             self.status_label.config(
                 text="No valid faces captured. Please try again.")
             return
-        # Save all templates
-        data = pickle.dumps(templates)
-        protected = dpapi_protect(data)
-        with open(TEMPLATE_FILE, "wb") as f:
-            f.write(protected)
+        # Replace this user's templates, keeping everyone else enrolled
+        replace_user_templates(self.user_id, templates)
         self.status_label.config(
             text=f"Enrollment complete! {len(templates)} images saved.")
-        self.camera.release()
+        self.preview.stop()
+        if self._owns_camera:
+            self.camera.close()
         self.root.after(1500, self.root.destroy)
 
 
 class LockScreen:
     """Improved lock screen with better threading and user feedback"""
 
-    def __init__(self, root):
+    def __init__(self, root, camera: Optional[CameraSession] = None):
+        from tkinter import Label, Button
+
         self.root = root
         self.is_checking = False
         self.check_thread = None
+        self.cancel_event = threading.Event()  # Stops an attempt in flight
+        # One camera session for every retry instead of reopening the device
+        self._owns_camera = camera is None
+        self.camera = camera if camera is not None else CameraSession()
 
         # Configure window
         root.attributes("-fullscreen", True)
@@ -496,15 +1534,22 @@ class LockScreen:
     def recognition_worker(self):
         """Worker thread for face recognition"""
         try:
-            self.root.after(0, lambda: self.update_status(
-                "Initializing camera...", "yellow"))
+            if not self.camera.healthy():
+                self.root.after(0, lambda: self.update_status(
+                    "Initializing camera...", "yellow"))
             self.root.after(0, lambda: self.update_progress("●●○"))
 
-            if is_live_sequence():
+            result = is_live_sequence(camera=self.camera, cancel=self.cancel_event)
+            if result.cancelled:
+                return
+            if not self.camera.is_initialized:
+                logging.warning(f"Camera session unavailable: {self.camera.health()}")
+            if result:
                 self.root.after(0, lambda: self.update_status(
-                    "✓ Face recognized! Unlocking...", "lightgreen"))
+                    f"✓ Welcome, {result.user_id}! Unlocking...", "lightgreen"))
                 self.root.after(0, lambda: self.update_progress("●●●"))
                 self.root.after(1000, self.unlock_system)
+                adapt_templates(result)
             else:
                 self.root.after(0, lambda: self.update_status(
                     "❌ Recognition failed. Retrying...", "orange"))
@@ -523,14 +1568,24 @@ class LockScreen:
 
     def unlock_system(self):
         """Unlock the system"""
+        from tkinter import messagebox
+
         logging.info("User authenticated successfully")
+        if self._owns_camera:
+            self.camera.close()
         messagebox.showinfo("Face Unlock", "Authentication successful!")
         self.root.destroy()
 
     def admin_exit(self):
         """Administrative exit for development"""
+        from tkinter import messagebox
+
         if messagebox.askyesno("Exit", "Are you sure you want to exit? (Development only)"):
             logging.info("Administrative exit")
+            self.cancel_event.set()
+            if self.check_thread is not None:
+                self.check_thread.join(timeout=2.0)
+            self.camera.close()
             self.root.destroy()
             sys.exit(0)
 
@@ -565,17 +1620,21 @@ def main():
         print(f"  Template file: {TEMPLATE_FILE}")
         return
 
+    # Enrollment and the lock screen share one open camera
+    camera = CameraSession()
     try:
+        from tkinter import Tk
+
         # Always run guided enrollment before authentication
         print("Starting guided enrollment...")
         root = Tk()
-        GuidedEnrollment(root)
+        GuidedEnrollment(root, camera=camera)
         root.mainloop()
         print("Enrollment finished. Starting face authentication...")
 
-        # Verify templates are valid
-        templates = load_templates()
-        if not templates:
+        # Verify templates are valid (this also warms the template cache)
+        gallery, _ = get_cached_gallery()
+        if not gallery:
             print("❌ Failed to load face templates!")
             print("The template file may be corrupted. Please re-enroll:")
             print(f"python {sys.argv[0]} enroll")
@@ -588,7 +1647,7 @@ def main():
         root = Tk()
         root.title("Face Unlock System")
 
-        app = LockScreen(root)
+        app = LockScreen(root, camera=camera)
         root.mainloop()
     except KeyboardInterrupt:
         print("\n⚠ Program interrupted by user")
@@ -596,6 +1655,8 @@ def main():
         logging.error(f"Main function error: {e}")
         print(f"❌ An error occurred: {e}")
         print("Please check the logs for more details.")
+    finally:
+        camera.close()
 
 
 if __name__ == "__main__":